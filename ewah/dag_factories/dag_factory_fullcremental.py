@@ -19,15 +19,101 @@ from ewah.ewah_utils.airflow_utils import (
     datetime_utcnow_with_tz,
     EWAHSqlSensor,
 )
+from ewah.ewah_utils.python_utils import fast_deepcopy
 from ewah.operators.base import EWAHBaseOperator
 from ewah.hooks.base import EWAHBaseHook
 
 from datetime import datetime, timedelta
-from collections.abc import Iterable
-from copy import deepcopy
+from functools import lru_cache, partial
 from typing import Optional, Type, Callable, List, Tuple, Union
 
+import inspect
 import re
+import sys
+import types
+
+# DAG name suffixes of the two DAGs
+_SUFFIX_FR = sys.intern("_Periodic_Full_Refresh")
+_SUFFIX_INC = sys.intern("_Intraperiod_Incremental")
+
+# read-only default for missing or empty configs, avoids a new dict per table
+_EMPTY_DICT = types.MappingProxyType({})
+
+# strips all characters that are not allowed in a task_id
+_TASK_ID_SANITIZER = re.compile(r"[^a-zA-Z0-9_]")
+
+
+# EXISTS stops at the first running DAG instead of counting all of them.
+# A partial index lets this query be answered from the index alone:
+#   CREATE INDEX dag_run_running_idx ON public.dag_run (dag_id, execution_date)
+#   WHERE state = 'running';
+# The execution dates are rendered by airflow's templating at runtime.
+_SQL_FR_TEMPLATE = """
+    SELECT
+         -- only run if there are no active DAGs that have to finish first
+        CASE WHEN EXISTS (
+            SELECT 1
+            FROM public.dag_run
+            WHERE state = 'running'
+              AND (
+                    -- no previous full refresh, please!
+                    (dag_id = '{dag_id_fr}'
+                        AND execution_date < '{{{{ execution_date }}}}')
+                    -- no old incremental running, please!
+                OR  (dag_id = '{dag_id_inc}'
+                        AND execution_date < '{{{{ next_execution_date }}}}')
+              )
+            LIMIT 1
+        ) THEN 0 ELSE 1 END
+"""
+
+
+@lru_cache(maxsize=256)
+def _normalize_read_right_users(
+    read_right_users: Optional[Union[Tuple[str, ...], str]]
+) -> Optional[Tuple[str, ...]]:
+    """Turn a comma-separated string of users into a tuple of users.
+
+    Takes a hashable argument, i.e. lists must be turned into tuples first.
+    """
+    if isinstance(read_right_users, str):
+        return tuple(u.strip() for u in read_right_users.split(","))
+    return read_right_users
+
+
+def _fr_execution_date(
+    execution_date: datetime,
+    start_date_fr: datetime,
+    schedule_interval_full_refresh: timedelta,
+) -> datetime:
+    """Return the execution_date of the full refresh DAG run that must be
+    complete before the incremental DAG run of execution_date may start.
+
+    This is the full refresh run of the period prior to the period that
+    contains execution_date.
+    """
+    periods = (execution_date - start_date_fr) // schedule_interval_full_refresh
+    return start_date_fr + (periods - 1) * schedule_interval_full_refresh
+
+
+@lru_cache(maxsize=None)
+def _get_accepted_kwargs(operator_class: type) -> frozenset:
+    """Return the names of all kwargs accepted by an operator's __init__ methods."""
+    _kinds = (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)
+    return frozenset(
+        name
+        for cls in operator_class.__mro__
+        if "__init__" in vars(cls)
+        for (name, param) in inspect.signature(cls.__init__).parameters.items()
+        if param.kind in _kinds
+    )
+
+
+def _filter_kwargs(operator_class: type, kwargs: dict) -> dict:
+    """Drop all kwargs that the operator does not accept, e.g. EWAH operator
+    kwargs in additional_task_args that are given to a sensor."""
+    accepted_kwargs = _get_accepted_kwargs(operator_class)
+    return {key: value for (key, value) in kwargs.items() if key in accepted_kwargs}
 
 
 def dag_factory_fullcremental(
@@ -49,33 +135,48 @@ def dag_factory_fullcremental(
     additional_dag_args: Optional[dict] = None,
     additional_task_args: Optional[dict] = None,
     logging_func: Optional[Callable] = None,
-    **kwargs
+    deferrable_sensor: bool = False,
+    fr_sensor_poke_interval: Optional[Union[int, float, timedelta]] = None,
+    inc_sensor_poke_interval: Optional[Union[int, float, timedelta]] = None,
+    fr_sensor_mode: Optional[str] = None,
+    inc_sensor_mode: Optional[str] = None,
+    catchup_full_refresh: bool = True,
+    catchup_incremental: bool = True,
+    max_active_runs_full_refresh: int = 1,
+    max_active_runs_incremental: int = 1,
+    **kwargs,
 ) -> Tuple[DAG, DAG]:
     def raise_exception(msg: str) -> None:
         """Add information to error message before raising."""
-        raise Exception("DAG: {0} - Error: {1}".format(dag_name, msg))
+        raise Exception(f"DAG: {dag_name} - Error: {msg}")
 
     logging_func = logging_func or print
 
     if kwargs:
-        logging_func("unused config: {0}".format(str(kwargs)))
+        logging_func(f"unused config: {kwargs}")
 
     additional_dag_args = additional_dag_args or {}
     additional_task_args = additional_task_args or {}
 
+    if isinstance(read_right_users, (list, tuple, set)):
+        read_right_users = tuple(read_right_users)
+    elif not (read_right_users is None or isinstance(read_right_users, str)):
+        raise_exception("read_right_users must be a list or string!")
+    read_right_users = _normalize_read_right_users(read_right_users)
     if not read_right_users is None:
-        if isinstance(read_right_users, str):
-            read_right_users = [u.strip() for u in read_right_users.split(",")]
-        if not isinstance(read_right_users, Iterable):
-            raise_exception("read_right_users must be an iterable or string!")
+        read_right_users = list(read_right_users)  # etl_schema_tasks needs a list
     if not isinstance(schedule_interval_full_refresh, timedelta):
         raise_exception("schedule_interval_full_refresh must be timedelta!")
     if not isinstance(schedule_interval_incremental, timedelta):
         raise_exception("schedule_interval_incremental must be timedelta!")
     if schedule_interval_incremental >= schedule_interval_full_refresh:
-        _msg = "schedule_interval_incremental must be shorter than "
-        _msg += "schedule_interval_full_refresh!"
-        raise_exception(_msg)
+        raise_exception(
+            "schedule_interval_incremental must be shorter than "
+            "schedule_interval_full_refresh!"
+        )
+    if not operator_config.get("tables"):
+        # fail before creating any DAG or task
+        raise_exception('Requires a "tables" dictionary in operator_config!')
 
     """Calculate the datetimes and timedeltas for the two DAGs.
 
@@ -89,79 +190,89 @@ def dag_factory_fullcremental(
     if not start_date.tzinfo:
         # if no timezone is given, assume UTC
         raise_exception("start_date must be timezone aware!")
-    time_now = datetime_utcnow_with_tz() + schedule_interval_incremental / 2
+    # Both start dates only move at full refresh interval boundaries, so
+    # consecutive parses of the DAG file yield identical DAGs. This applies
+    # without catchup, too: the incremental DAG must start after the full
+    # refresh DAG, and its sensor looks for the full refresh run of start_date_fr.
+    time_now = datetime_utcnow_with_tz()
     if start_date > time_now:
         # Start date for both is in the future
         start_date_fr = start_date
         start_date_inc = start_date
     else:
-        _td = int((time_now - start_date) / schedule_interval_full_refresh) - 1
+        # timedelta // timedelta is exact integer division of microseconds
+        _td = (time_now - start_date) // schedule_interval_full_refresh - 1
         start_date_fr = start_date + _td * schedule_interval_full_refresh
         start_date_inc = start_date_fr + schedule_interval_full_refresh
 
-    dag_name_fr = dag_name + "_Periodic_Full_Refresh"
-    dag_name_inc = dag_name + "_Intraperiod_Incremental"
+    dag_name_fr = f"{dag_name}{_SUFFIX_FR}"
+    dag_name_inc = f"{dag_name}{_SUFFIX_INC}"
+    # DAGs are not cached between parses: they are mutable and collect tasks,
+    # so a re-used DAG object would receive duplicate tasks.
+    shared_dag_kwargs = {
+        "end_date": end_date,
+        "default_args": default_args,
+        **additional_dag_args,
+    }
     dags = (
         DAG(
             dag_name_fr,
             start_date=start_date_fr,
-            end_date=end_date,
             schedule_interval=schedule_interval_full_refresh,
-            catchup=True,
-            max_active_runs=1,
-            default_args=default_args,
-            **additional_dag_args
+            catchup=catchup_full_refresh,
+            # Full refresh runs replace the whole schema -> keep this at 1
+            max_active_runs=max_active_runs_full_refresh,
+            **shared_dag_kwargs,
         ),
         DAG(
             dag_name_inc,
             start_date=start_date_inc,
-            end_date=end_date,
             schedule_interval=schedule_interval_incremental,
-            catchup=True,
-            max_active_runs=1,
-            default_args=default_args,
-            **additional_dag_args
+            catchup=catchup_incremental,
+            # May be larger than 1 if loading into the temporary schema of
+            # target_schema_suffix isolates the incremental runs from each other
+            max_active_runs=max_active_runs_incremental,
+            **shared_dag_kwargs,
         ),
     )
 
-    kickoff_fr, final_fr = etl_schema_tasks(
-        dag=dags[0],
-        dwh_engine=dwh_engine,
-        dwh_conn_id=dwh_conn_id,
-        target_schema_name=target_schema_name,
-        target_schema_suffix=target_schema_suffix,
-        target_database_name=target_database_name,
-        read_right_users=read_right_users,
-        **additional_task_args
-    )
+    # Both DAGs use the same schema tasks
+    schema_kwargs = {
+        **additional_task_args,
+        "dwh_engine": dwh_engine,
+        "dwh_conn_id": dwh_conn_id,
+        "target_schema_name": target_schema_name,
+        "target_schema_suffix": target_schema_suffix,
+        "target_database_name": target_database_name,
+        "read_right_users": read_right_users,
+    }
+    kickoff_fr, final_fr = etl_schema_tasks(dag=dags[0], **schema_kwargs)
+    kickoff_inc, final_inc = etl_schema_tasks(dag=dags[1], **schema_kwargs)
 
-    kickoff_inc, final_inc = etl_schema_tasks(
-        dag=dags[1],
-        dwh_engine=dwh_engine,
-        dwh_conn_id=dwh_conn_id,
-        target_schema_name=target_schema_name,
-        target_schema_suffix=target_schema_suffix,
-        target_database_name=target_database_name,
-        read_right_users=read_right_users,
-        **additional_task_args
+    sql_fr = _SQL_FR_TEMPLATE.format(
+        dag_id_fr=dags[0]._dag_id,
+        dag_id_inc=dags[1]._dag_id,
     )
 
-    sql_fr = """
-        SELECT
-             -- only run if there are no active DAGs that have to finish first
-            CASE WHEN COUNT(*) = 0 THEN 1 ELSE 0 END
-        FROM public.dag_run
-        WHERE state = 'running'
-          AND (
-                (dag_id = '{0}' AND execution_date < '{1}')
-            OR  (dag_id = '{2}' AND execution_date < '{3}')
-          )
-    """.format(
-        dags[0]._dag_id,  # fr
-        "{{ execution_date }}",  # no previous full refresh, please!
-        dags[1]._dag_id,  # inc
-        "{{ next_execution_date }}",  # no old incremental running, please!
+    # Sensors poke at most every 5 minutes, or more often for short schedules.
+    # Rescheduling puts load on the scheduler for short intervals, thus poke
+    # instead if the incremental DAG runs more often than every 5 minutes.
+    default_poke_interval = min(
+        5 * 60, schedule_interval_incremental.total_seconds() / 2
     )
+    if schedule_interval_incremental < timedelta(minutes=5):
+        default_sensor_mode = "poke"
+    else:
+        default_sensor_mode = "reschedule"  # don't block a worker and pool slot
+    # 0 is a valid poke_interval, only None falls back to the default
+    if fr_sensor_poke_interval is None:
+        fr_sensor_poke_interval = default_poke_interval
+    elif isinstance(fr_sensor_poke_interval, timedelta):
+        fr_sensor_poke_interval = fr_sensor_poke_interval.total_seconds()
+    if inc_sensor_poke_interval is None:
+        inc_sensor_poke_interval = default_poke_interval
+    elif isinstance(inc_sensor_poke_interval, timedelta):
+        inc_sensor_poke_interval = inc_sensor_poke_interval.total_seconds()
 
     # Sense if a previous instance runs OR if any incremental loads run
     # except incremental load of the same time, which is expected and waits
@@ -170,9 +281,10 @@ def dag_factory_fullcremental(
         conn_id=airflow_conn_id,
         sql=sql_fr,
         dag=dags[0],
-        poke_interval=5 * 60,
-        mode="reschedule",  # don't block a worker and pool slot
-        **additional_task_args
+        poke_interval=fr_sensor_poke_interval,
+        mode=fr_sensor_mode or default_sensor_mode,
+        deferrable=deferrable_sensor,  # poll from the triggerer instead
+        **_filter_kwargs(EWAHSqlSensor, additional_task_args),
     )
 
     # Sense if a previous instance is complete excepts if its the first, then
@@ -185,40 +297,63 @@ def dag_factory_fullcremental(
         execution_delta=schedule_interval_incremental,
         backfill_dag_id=dags[0]._dag_id,
         backfill_external_task_id=final_fr.task_id,
-        backfill_execution_delta=schedule_interval_full_refresh,
+        backfill_execution_date_fn=partial(
+            _fr_execution_date,
+            start_date_fr=start_date_fr,
+            schedule_interval_full_refresh=schedule_interval_full_refresh,
+        ),
         dag=dags[1],
-        poke_interval=5 * 60,
-        mode="reschedule",  # don't block a worker and pool slot
-        **additional_task_args
+        poke_interval=inc_sensor_poke_interval,
+        mode=inc_sensor_mode or default_sensor_mode,
+        **_filter_kwargs(ExtendedETS, additional_task_args),
     )
 
     fr_snsr >> kickoff_fr
     inc_ets >> kickoff_inc
 
+    # Build the static part of the task kwargs once, merge per table below
+    base_args = {
+        **additional_task_args,
+        **operator_config.get("general_config", _EMPTY_DICT),
+    }
+    tasks_fr = []
+    tasks_inc = []
     for table in operator_config["tables"].keys():
-        arg_dict_inc = deepcopy(additional_task_args)
-        arg_dict_inc.update(operator_config.get("general_config", {}))
-        op_conf = operator_config["tables"][table] or {}
-        arg_dict_inc.update(op_conf)
-        arg_dict_inc.update(
-            {
-                "extract_strategy": EC.ES_INCREMENTAL,
-                "task_id": "extract_load_" + re.sub(r"[^a-zA-Z0-9_]", "", table),
-                "dwh_engine": dwh_engine,
-                "dwh_conn_id": dwh_conn_id,
-                "target_table_name": op_conf.get("target_table_name", table),
-                "target_schema_name": target_schema_name,
-                "target_schema_suffix": target_schema_suffix,
-                "target_database_name": target_database_name,
-            }
-        )
-        arg_dict_fr = deepcopy(arg_dict_inc)
-        arg_dict_fr["extract_strategy"] = EC.ES_FULL_REFRESH
-
-        task_fr = el_operator(dag=dags[0], **arg_dict_fr)
+        op_conf = operator_config["tables"][table] or _EMPTY_DICT
+        arg_dict_inc = {
+            **base_args,
+            **op_conf,
+            "extract_strategy": EC.ES_INCREMENTAL,
+            "task_id": "extract_load_" + _TASK_ID_SANITIZER.sub("", table),
+            "dwh_engine": dwh_engine,
+            "dwh_conn_id": dwh_conn_id,
+            "target_table_name": op_conf.get("target_table_name", table),
+            "target_schema_name": target_schema_name,
+            "target_schema_suffix": target_schema_suffix,
+            "target_database_name": target_database_name,
+        }
+        # Initialize the incremental task first, it has the stricter checks
         task_inc = el_operator(dag=dags[1], **arg_dict_inc)
+        if el_operator._SUPPORTS_CLONE:
+            task_fr = task_inc.clone_for_dag(
+                dag=dags[0],
+                extract_strategy=EC.ES_FULL_REFRESH,
+            )
+        else:
+            arg_dict_fr = {**arg_dict_inc, "extract_strategy": EC.ES_FULL_REFRESH}
+            if arg_dict_inc.get("columns_definition"):
+                # upload_data() sets primary key flags in the columns_definition;
+                # the two tasks must not share the same nested dict
+                arg_dict_fr["columns_definition"] = fast_deepcopy(
+                    arg_dict_inc["columns_definition"]
+                )
+            task_fr = el_operator(dag=dags[0], **arg_dict_fr)
+
+        tasks_fr.append(task_fr)
+        tasks_inc.append(task_inc)
 
-        kickoff_fr >> task_fr >> final_fr
-        kickoff_inc >> task_inc >> final_inc
+    # set all dependencies at once instead of edge by edge per table
+    kickoff_fr >> tasks_fr >> final_fr
+    kickoff_inc >> tasks_inc >> final_inc
 
     return dags
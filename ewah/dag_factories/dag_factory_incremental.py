@@ -38,18 +38,28 @@ class ExtendedETS(ExternalTaskSensor):
 
         super().__init__(*args, **kwargs)
 
+    def _is_first_run(self, context: dict) -> bool:
+        """The first run is at the start_date of the DAG, or the first DagRun at
+        all, e.g. the latest interval of a DAG without catchup."""
+        if context["dag"].start_date == context["execution_date"]:
+            return True
+        dag_run = context.get("dag_run")
+        return dag_run is not None and dag_run.get_previous_dagrun() is None
+
     def execute(self, context: dict) -> None:
 
-        if context["dag"].start_date == context["execution_date"]:
+        if self._is_first_run(context):
             # First execution of the DAG.
             if self.backfill_dag_id:
                 # Check if the latest backfill ran! --> then run normally
-                self.execution_delta = (
-                    self.backfill_execution_delta or self.execution_delta
-                )
-                self.execution_date_fn = (
-                    self.backfill_execution_date_fn or self.execution_date_fn
-                )
+                if self.backfill_execution_date_fn:
+                    # execution_delta would take precedence if it was set
+                    self.execution_delta = None
+                    self.execution_date_fn = self.backfill_execution_date_fn
+                else:
+                    self.execution_delta = (
+                        self.backfill_execution_delta or self.execution_delta
+                    )
                 self.external_task_id = (
                     self.backfill_external_task_id or self.external_task_id
                 )
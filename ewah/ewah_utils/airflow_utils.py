@@ -8,12 +8,78 @@ from ewah.constants import EWAHConstants as EC
 
 from datetime import datetime, timedelta, timezone
 from copy import deepcopy
+import asyncio
 import pytz
 import re
 
+try:
+    from airflow.triggers.base import BaseTrigger, TriggerEvent
+except ImportError:
+    # Airflow < 2.2 has no triggerer, sensors can't be deferred
+    BaseTrigger = None
+
+
+def _sql_sensor_condition_met(hook, sql):
+    """Same success condition as the SqlSensor: first cell is truthy."""
+    records = hook.get_records(sql)
+    if not records:
+        return False
+    return str(records[0][0]) not in ("0", "")
+
+
+if BaseTrigger:
+
+    class EWAHSqlTrigger(BaseTrigger):
+        """Poll a SQL condition from within the triggerer process.
+
+        The EWAH hooks are synchronous, thus each poll runs in a thread of the
+        event loop's default executor so that the triggerer is never blocked.
+        """
+
+        def __init__(self, conn_id, sql, poll_interval=5 * 60):
+            super().__init__()
+            self.conn_id = conn_id
+            self.sql = sql
+            self.poll_interval = poll_interval
+
+        def serialize(self):
+            return (
+                "ewah.ewah_utils.airflow_utils.EWAHSqlTrigger",
+                {
+                    "conn_id": self.conn_id,
+                    "sql": self.sql,
+                    "poll_interval": self.poll_interval,
+                },
+            )
+
+        def _poke(self):
+            hook = EWAHBaseHook.get_hook_from_conn_id(self.conn_id)
+            try:
+                return _sql_sensor_condition_met(hook, self.sql)
+            finally:
+                hook.close()
+
+        async def run(self):
+            loop = asyncio.get_event_loop()
+            while not await loop.run_in_executor(None, self._poke):
+                await asyncio.sleep(self.poll_interval)
+            yield TriggerEvent({"status": "success"})
+
+else:
+    EWAHSqlTrigger = None
+
 
 class EWAHSqlSensor(SqlSensor):
-    """Overwrite native SQL sensor to allow usage of ewah custom connection types."""
+    """Overwrite native SQL sensor to allow usage of ewah custom connection types.
+
+    With deferrable=True, the sensor hands the polling over to the triggerer
+    and does not occupy a worker slot while waiting. Falls back to the regular
+    sensor behavior if the installed Airflow version can't defer tasks.
+    """
+
+    def __init__(self, *args, deferrable=False, **kwargs):
+        self.deferrable = deferrable
+        super().__init__(*args, **kwargs)
 
     def _get_hook(self):
         conn = EWAHBaseHook.get_connection(conn_id=self.conn_id)
@@ -21,6 +87,25 @@ class EWAHSqlSensor(SqlSensor):
             raise Exception("Must use an appropriate EWAH custom connection type!")
         return conn.get_hook()
 
+    def execute(self, context):
+        if not self.deferrable:
+            return super().execute(context)
+        if EWAHSqlTrigger is None:
+            self.log.info("Airflow version can't defer tasks, poking instead!")
+            return super().execute(context)
+        self.defer(
+            trigger=EWAHSqlTrigger(
+                conn_id=self.conn_id,
+                sql=self.sql,
+                poll_interval=self.poke_interval,
+            ),
+            method_name="execute_complete",
+            timeout=timedelta(seconds=self.timeout),
+        )
+
+    def execute_complete(self, context, event=None):
+        self.log.info("SQL condition met: {0}".format(str(event)))
+
 
 class PGO(BaseOperator):
     """Airflow operator to execute PostgreSQL statements.
@@ -90,6 +175,27 @@ def airflow_datetime_adjustments(datetime_raw):
     return datetime_raw
 
 
+def native_utc_datetime(datetime_raw):
+    """Like airflow_datetime_adjustments, but always returns a native datetime in
+    UTC - e.g. instead of a pendulum object, which is slower in comparisons and
+    arithmetics.
+    """
+    datetime_raw = airflow_datetime_adjustments(datetime_raw)
+    if datetime_raw is None:
+        return None
+    dt = datetime_raw.astimezone(timezone.utc)
+    return datetime(
+        dt.year,
+        dt.month,
+        dt.day,
+        dt.hour,
+        dt.minute,
+        dt.second,
+        dt.microsecond,
+        tzinfo=timezone.utc,
+    )
+
+
 def etl_schema_tasks(
     dag,
     dwh_engine,
@@ -1,6 +1,17 @@
 from collections.abc import Iterable
+from copy import deepcopy
+import pickle
 import six
 
 
 def is_iterable_not_string(obj):
     return isinstance(obj, Iterable) and not isinstance(obj, six.string_types)
+
+
+def fast_deepcopy(obj):
+    """Deep copy via a pickle round trip, which is a lot faster than deepcopy
+    for JSON-like objects. Falls back to deepcopy for unpicklable objects."""
+    try:
+        return pickle.loads(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return deepcopy(obj)
@@ -2,6 +2,7 @@ from ewah.hooks.base import EWAHBaseHook
 
 import mailchimp3
 
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 
 
@@ -28,17 +29,42 @@ class EWAHMailchimpHook(EWAHBaseHook):
             },
         }
 
+    # The API returns at most 1000 records per request
+    _MAX_PAGE_SIZE = 1000
+
+    def _get_page(self, resource: str, count: int, offset: int) -> Dict[str, Any]:
+        # One client per request, clients are not shared between threads
+        client = mailchimp3.MailChimp(mc_user=self.conn.user, mc_api=self.conn.api_key)
+        return getattr(client, resource).all(count=count, offset=offset)
+
     def get_data_in_batches(
-        self, resource: str, batch_size: int = 10000
+        self, resource: str, batch_size: int = 1000, max_workers: int = 4
     ) -> List[Dict[str, Any]]:
-        client = mailchimp3.MailChimp(mc_user=self.conn.user, mc_api=self.conn.api_key)
-        mc_resource = getattr(client, resource)
-        keepgoing = True
-        offset = 0
-        while keepgoing:
-            data = mc_resource.all(count=batch_size, offset=offset)[resource]
-            if data:
-                yield data
-                offset += batch_size
-            else:
-                keepgoing = False
+        batch_size = min(batch_size, self._MAX_PAGE_SIZE)
+        response = self._get_page(resource, batch_size, 0)
+        data = response[resource]
+        if data:
+            yield data
+        total_items = response.get("total_items")
+        if total_items is None or max_workers <= 1:
+            # Fall back to fetching one page after the other
+            offset = len(data)
+            while len(data) == batch_size:  # a short page is the last page
+                data = self._get_page(resource, batch_size, offset)[resource]
+                if data:
+                    yield data
+                    offset += len(data)
+            return
+
+        # Fetch the remaining pages concurrently; pages are fetched in windows
+        # of max_workers pages such that no more pages than that are held in
+        # memory while the caller uploads them (in order, in the main thread)
+        offsets = list(range(batch_size, total_items, batch_size))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for i in range(0, len(offsets), max_workers):
+                for response in executor.map(
+                    lambda offset: self._get_page(resource, batch_size, offset),
+                    offsets[i : i + max_workers],
+                ):
+                    if response[resource]:
+                        yield response[resource]
@@ -8,10 +8,7 @@ class EWAHAircallOperator(EWAHBaseOperator):
 
     _NAMES = ["aircall"]
 
-    _ACCEPTED_EXTRACT_STRATEGIES = {
-        EC.ES_FULL_REFRESH: True,
-        EC.ES_INCREMENTAL: True,
-    }
+    _ACCEPTED_EXTRACT_STRATEGIES = frozenset({EC.ES_FULL_REFRESH, EC.ES_INCREMENTAL})
 
     _CONN_TYPE = EWAHAircallHook.conn_type
 
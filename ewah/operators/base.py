@@ -1,20 +1,36 @@
 from airflow.models import BaseOperator
+from airflow.utils import timezone
 
 from ewah.constants import EWAHConstants as EC
 from ewah.ewah_utils.airflow_utils import (
     datetime_utcnow_with_tz,
     airflow_datetime_adjustments as ada,
+    native_utc_datetime,
 )
+from ewah.ewah_utils.python_utils import fast_deepcopy
 from ewah.hooks.base import EWAHBaseHook
 from ewah.uploaders import get_uploader
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict
 
 import copy
 import hashlib
+import random
 import time
 
+# Extract strategies that do not need to know how to update existing rows
+_ES_WITHOUT_UPDATE_KEYS = frozenset({EC.ES_FULL_REFRESH})
+
+
+def _has_pk(columns_definition):
+    "Return True if any column of the columns_definition is a primary key."
+    return any(
+        definition.get(EC.QBC_FIELD_PK)
+        for definition in (columns_definition or {}).values()
+    )
+
 
 class EWAHBaseOperator(BaseOperator):
     """Extension of airflow's native Base Operator.
@@ -40,6 +56,7 @@ class EWAHBaseOperator(BaseOperator):
     - If available, take the columns_definition from the self.update() call
     - If None, check if columns_definition was supplied to the operator at init
     - If neither, create a columns_definition on the fly using (all) the data
+      or, if infer_schema_from_sample is True, a sample of large uploads
 
     columns_definition is a dictionary with fieldname:properties. Properties
     is None or a dictionary of option:value where option can be one of the
@@ -71,26 +88,43 @@ class EWAHBaseOperator(BaseOperator):
     )
 
     # Child class must update or overwrite these values
-    # A missing element is interpreted as False
-    _ACCEPTED_EXTRACT_STRATEGIES = {
-        EC.ES_FULL_REFRESH: False,
-        EC.ES_INCREMENTAL: False,
-        EC.ES_GET_NEXT: False,
-    }
+    # Set of the extract strategies the operator supports
+    _ACCEPTED_EXTRACT_STRATEGIES = frozenset()
 
     _REQUIRES_COLUMNS_DEFINITION = False  # raise error if true and None supplied
 
     _CONN_TYPE = None  # overwrite me with the required connection type, if applicable
 
+    # Set to True in a child class if its __init__ only stores the kwargs and
+    # nothing depends on the extract_strategy. DAG factories may then copy a
+    # task via clone_for_dag() instead of initializing a second operator.
+    _SUPPORTS_CLONE = False
+
     _INDEX_QUERY = """
         CREATE INDEX IF NOT EXISTS {0}
         ON "{1}"."{2}" ({3})
     """
 
+    # upload_data() splits data into batches of this many rows per DWH engine.
+    # Engines that are not listed receive all data at once.
+    _OPTIMAL_BATCH_SIZE = {
+        EC.DWH_ENGINE_POSTGRES: 100000,
+        EC.DWH_ENGINE_SNOWFLAKE: 100000,
+    }
+
     upload_call_count = 0
 
     _metadata = {}  # to be updated by operator, if applicable
 
+    _target_table_exists = None  # cached by test_if_target_table_exists()
+
+    # With infer_schema_from_sample, uploads of more than _SCHEMA_SAMPLE_THRESHOLD
+    # rows infer their schema from the first _SCHEMA_SAMPLE_HEAD rows and
+    # _SCHEMA_SAMPLE_RANDOM randomly chosen rows of the remainder
+    _SCHEMA_SAMPLE_THRESHOLD = 10000
+    _SCHEMA_SAMPLE_HEAD = 2000
+    _SCHEMA_SAMPLE_RANDOM = 1000
+
     def __init__(
         self,
         source_conn_id,
@@ -121,11 +155,17 @@ class EWAHBaseOperator(BaseOperator):
         # wait_for_seconds only applies for incremental loads
         add_metadata=True,
         rename_columns: Optional[Dict[str, str]] = None,  # Rename columns
+        infer_schema_from_sample=False,  # see _create_columns_definition
         *args,
         **kwargs
     ):
         super().__init__(*args, **kwargs)
 
+        # Adding the task to a DAG alters its start_date and end_date, keep the
+        # original values for clone_for_dag()
+        self._init_start_date = timezone.convert_to_utc(kwargs.get("start_date"))
+        self._init_end_date = timezone.convert_to_utc(kwargs.get("end_date"))
+
         assert not (rename_columns and columns_definition)
         assert rename_columns is None or isinstance(rename_columns, dict)
 
@@ -139,7 +179,7 @@ class EWAHBaseOperator(BaseOperator):
         _msg = "extract_strategy {0} not accepted for this operator!".format(
             extract_strategy,
         )
-        assert self._ACCEPTED_EXTRACT_STRATEGIES.get(extract_strategy), _msg
+        assert extract_strategy in self._ACCEPTED_EXTRACT_STRATEGIES, _msg
 
         if hash_columns and not clean_data_before_upload:
             _msg = "column hashing is only possible with data cleaning!"
@@ -180,24 +220,13 @@ class EWAHBaseOperator(BaseOperator):
                 "Cannot supply BOTH primary_key_column_name AND" + " update_on_columns!"
             )
 
-        if not extract_strategy in [EC.ES_FULL_REFRESH]:
+        if not extract_strategy in _ES_WITHOUT_UPDATE_KEYS:
             # Required settings for incremental loads
             # Update condition for new load strategies as required
             if not (
                 update_on_columns
                 or primary_key_column_name
-                or (
-                    columns_definition
-                    and (
-                        0
-                        < sum(
-                            [
-                                bool(columns_definition[col].get(EC.QBC_FIELD_PK))
-                                for col in list(columns_definition.keys())
-                            ]
-                        )
-                    )
-                )
+                or _has_pk(columns_definition)
             ):
                 raise Exception(
                     "If this is incremental loading of a table, "
@@ -210,18 +239,15 @@ class EWAHBaseOperator(BaseOperator):
 
         _msg = "load_data_from_relative and load_data_until_relative must be"
         _msg += " timedelta if supplied!"
-        assert isinstance(
-            load_data_from_relative,
-            (type(None), timedelta),
+        assert load_data_from_relative is None or isinstance(
+            load_data_from_relative, timedelta
         ), _msg
-        assert isinstance(
-            load_data_until_relative,
-            (type(None), timedelta),
+        assert load_data_until_relative is None or isinstance(
+            load_data_until_relative, timedelta
         ), _msg
         _msg = "load_data_chunking_timedelta must be timedelta!"
-        assert isinstance(
-            load_data_chunking_timedelta,
-            (type(None), timedelta),
+        assert load_data_chunking_timedelta is None or isinstance(
+            load_data_chunking_timedelta, timedelta
         ), _msg
 
         self.source_conn_id = source_conn_id
@@ -255,17 +281,51 @@ class EWAHBaseOperator(BaseOperator):
         self.wait_for_seconds = wait_for_seconds
         self.add_metadata = add_metadata
         self.rename_columns = rename_columns
+        self.infer_schema_from_sample = infer_schema_from_sample
 
         self.uploader = get_uploader(self.dwh_engine)
 
         _msg = "DWH hook does not support extract strategy {0}!".format(
             extract_strategy,
         )
-        # assert self.uploader._ACCEPTED_EXTRACT_STRATEGIES.get(extract_strategy), _msg
+        # assert extract_strategy in self.uploader._ACCEPTED_EXTRACT_STRATEGIES, _msg
+
+    def clone_for_dag(self, dag, extract_strategy):
+        """Return a shallow copy of this task for another DAG and extract strategy.
+
+        Only use if the operator class has _SUPPORTS_CLONE set to True.
+        """
+        assert self._SUPPORTS_CLONE, "Operator does not support cloning!"
+        _msg = "extract_strategy {0} not accepted for this operator!".format(
+            extract_strategy,
+        )
+        assert extract_strategy in self._ACCEPTED_EXTRACT_STRATEGIES, _msg
+
+        task = copy.copy(self)
+        # A copy must not share the relatives or the DAG with the original
+        task._dag = None
+        task._upstream_task_ids = set()
+        task._downstream_task_ids = set()
+        # The new DAG sets the dates from the task's own dates, like at init
+        task.start_date = self._init_start_date
+        task.end_date = self._init_end_date
+        # columns_definition is altered at execution
+        task.columns_definition = fast_deepcopy(self.columns_definition)
+        task.extract_strategy = extract_strategy
+        # Like at init, the task belongs to the root TaskGroup of its DAG
+        dag.task_group.add(task)
+        task.dag = dag
+        return task
 
     def ewah_execute(self, context):
         raise Exception("You need to overwrite me!")
 
+    def get_cached_connection(self, conn_id):
+        "Get a connection, fetching it only once per task execution."
+        if not conn_id in self._conn_cache:
+            self._conn_cache[conn_id] = EWAHBaseHook.get_connection(conn_id)
+        return self._conn_cache[conn_id]
+
     def execute(self, context):
         """Why this method is defined here:
         When executing a task, airflow calls this method. Generally, this
@@ -278,12 +338,19 @@ class EWAHBaseOperator(BaseOperator):
         # required for metadata in data upload
         self._execution_time = datetime_utcnow_with_tz()
         self._context = context
+        # Convert the (pendulum) execution dates once for all uses
+        self._execution_date = native_utc_datetime(context["execution_date"])
+        self._next_execution_date = native_utc_datetime(
+            context.get("next_execution_date")
+        )
 
-        self.uploader = self.uploader(EWAHBaseHook.get_connection(self.dwh_conn_id))
+        # each connection is only fetched once from the metadata DB per run
+        self._conn_cache = {}
+        self.uploader = self.uploader(self.get_cached_connection(self.dwh_conn_id))
 
         if self.source_conn_id:
             # resolve conn id here & delete the object to avoid usage elsewhere
-            self.source_conn = EWAHBaseHook.get_connection(self.source_conn_id)
+            self.source_conn = self.get_cached_connection(self.source_conn_id)
             self.source_hook = self.source_conn.get_hook()
         del self.source_conn_id
 
@@ -311,8 +378,8 @@ class EWAHBaseOperator(BaseOperator):
         data_until = ada(self.load_data_until)
         if self.extract_strategy == EC.ES_INCREMENTAL:
             _tdz = timedelta(days=0)  # aka timedelta zero
-            _ed = context["execution_date"]
-            _ned = context["next_execution_date"]
+            _ed = self._execution_date
+            _ned = self._next_execution_date
 
             # normal incremental load
             _ed -= self.load_data_from_relative or _tdz
@@ -351,7 +418,7 @@ class EWAHBaseOperator(BaseOperator):
         # after 12.32pm due to some internal delays. In those cases, make
         # sure the (incremental loading) DAGs don't execute too quickly.
         if self.wait_for_seconds and self.extract_strategy == EC.ES_INCREMENTAL:
-            wait_until = context.get("next_execution_date")
+            wait_until = self._next_execution_date
             if wait_until:
                 wait_until += timedelta(seconds=self.wait_for_seconds)
                 self.log.info(
@@ -359,10 +426,11 @@ class EWAHBaseOperator(BaseOperator):
                         str(wait_until),
                     )
                 )
-            while wait_until and datetime_utcnow_with_tz() < wait_until:
                 # Only sleep a maximum of 5s at a time
-                wait_for_timedelta = wait_until - datetime_utcnow_with_tz()
-                time.sleep(max(0, min(wait_for_timedelta.total_seconds(), 5)))
+                remaining = (wait_until - datetime_utcnow_with_tz()).total_seconds()
+                while remaining > 0:
+                    time.sleep(min(remaining, 5))
+                    remaining = (wait_until - datetime_utcnow_with_tz()).total_seconds()
 
         # execute operator
         if self.load_data_chunking_timedelta and data_from and data_until:
@@ -379,28 +447,30 @@ class EWAHBaseOperator(BaseOperator):
             self.ewah_execute(context)
 
         # if PostgreSQL and arg given: create indices
-        for column in self.index_columns:
+        if self.index_columns:
             assert self.dwh_engine == EC.DWH_ENGINE_POSTGRES
             # Use hashlib to create a unique 63 character string as index
             # name to avoid breaching index name length limits & accidental
             # duplicates / missing indices due to name truncation leading to
             # identical index names.
+            index_name_prefix = (
+                temp_schema_name + "." + self.target_table_name + "."
+            ).encode()
+            # Create all indices with a single round trip
             self.uploader.dwh_hook.execute(
-                self._INDEX_QUERY.format(
-                    "__ewah_"
-                    + hashlib.blake2b(
-                        (
-                            temp_schema_name
-                            + "."
-                            + self.target_table_name
-                            + "."
-                            + column
-                        ).encode(),
-                        digest_size=28,
-                    ).hexdigest(),
-                    self.target_schema_name + self.target_schema_suffix,
-                    self.target_table_name,
-                    column,
+                ";".join(
+                    [
+                        self._INDEX_QUERY.format(
+                            "__ewah_"
+                            + self._get_index_name_hash(
+                                index_name_prefix + column.encode()
+                            ),
+                            temp_schema_name,
+                            self.target_table_name,
+                            column,
+                        )
+                        for column in self.index_columns
+                    ]
                 )
             )
 
@@ -410,7 +480,23 @@ class EWAHBaseOperator(BaseOperator):
         self.uploader.commit()
         self.uploader.close()
 
+    @staticmethod
+    def _get_index_name_hash(value: bytes) -> str:
+        """Return the 56 character hex digest of value used in index names.
+
+        Index names persist in the DWH: a different digest renames all indices
+        of existing tables, and tables copied including their indices would
+        then get each index twice. Thus, keep this digest as it is.
+        """
+        return hashlib.blake2b(value, digest_size=28).hexdigest()
+
     def test_if_target_table_exists(self):
+        # The result is cached; uploading data updates the cached value
+        if self._target_table_exists is None:
+            self._target_table_exists = self._test_if_target_table_exists()
+        return self._target_table_exists
+
+    def _test_if_target_table_exists(self):
         # Need to use existing hook to work within open transaction
         kwargs = {
             "table_name": self.target_table_name,
@@ -425,56 +511,94 @@ class EWAHBaseOperator(BaseOperator):
         # Thus, fail until explicitly added
         raise Exception("Function not implemented!")
 
+    def _collect_field_types(self, data):
+        """Collect the python types of each column in a single pass over data.
+
+        Insertion order of the returned dict determines the order of columns.
+        Hash columns map to None. Sets excluded columns to None in data.
+        """
+        exclude_columns = set(self.exclude_columns)
+        hash_columns = set(self.hash_columns or [])
+        field_types = {}
+        # Local names for the lookups in the hot loop below
+        setdefault = field_types.setdefault
+        _type = type
+        for datum in data:
+            for (field, value) in datum.items():
+                if field in exclude_columns:
+                    datum[field] = None
+                elif field in hash_columns:
+                    setdefault(field, None)
+                elif not value is None:
+                    setdefault(field, set()).add(_type(value))
+        return field_types
+
     def _create_columns_definition(self, data):
-        "Create a columns_definition from data (list of dicts)."
-        inconsistent_data_type = EC.QBC_TYPE_MAPPING[self.dwh_engine].get(
-            EC.QBC_TYPE_MAPPING_INCONSISTENT
-        )
+        """Create a columns_definition from data (list of dicts).
 
-        def get_field_type(value):
-            return (
-                EC.QBC_TYPE_MAPPING[self.dwh_engine].get(type(value))
-                or inconsistent_data_type
-            )
+        If infer_schema_from_sample is True, large uploads only use a sample of the
+        data to infer the data types. Data types that only occur outside the sample
+        are not detected. If the sample misses a column of the data altogether,
+        all data is used.
+        """
+        type_mapping = EC.QBC_TYPE_MAPPING[self.dwh_engine]
+        inconsistent_data_type = type_mapping.get(EC.QBC_TYPE_MAPPING_INCONSISTENT)
+
+        # First collect the python types of each column, then map each column's
+        # types to a DWH type once.
+        if self.infer_schema_from_sample and (
+            len(data) > self._SCHEMA_SAMPLE_THRESHOLD
+        ):
+            head = self._SCHEMA_SAMPLE_HEAD
+            # Sorted to retain the order of the data in the sample
+            sample_rows = data[:head] + [
+                data[i]
+                for i in sorted(
+                    random.sample(range(head, len(data)), self._SCHEMA_SAMPLE_RANDOM)
+                )
+            ]
+            field_types = self._collect_field_types(sample_rows)
+            known_columns = set(field_types)
+            known_columns.update(self.exclude_columns)
+            all_columns = set()
+            for datum in data:
+                all_columns.update(datum)
+            if all_columns.issubset(known_columns):
+                for column in self.exclude_columns:
+                    for datum in data:
+                        if column in datum:
+                            datum[column] = None
+            else:
+                self.log.info("Schema sample is incomplete, using all data.")
+                field_types = self._collect_field_types(data)
+        else:
+            field_types = self._collect_field_types(data)
 
         result = {}
-        for datum in data:
-            for field in datum.keys():
-                if field in self.exclude_columns:
-                    datum[field] = None
-                elif field in (self.hash_columns or []) and not result.get(field):
-                    # Type is appropriate string type & QBC_FIELD_HASH is true
-                    result.update(
-                        {
-                            field: {
-                                EC.QBC_FIELD_TYPE: get_field_type("str"),
-                                EC.QBC_FIELD_HASH: True,
-                            }
-                        }
-                    )
-                elif not (
-                    result.get(field, {}).get(EC.QBC_FIELD_TYPE)
-                    == inconsistent_data_type
-                ) and (not datum[field] is None):
-                    if result.get(field):
-                        # column has been added in a previous iteration.
-                        # If not default column: check if new and old column
-                        #   type identification agree.
-                        if not (
-                            result[field][EC.QBC_FIELD_TYPE]
-                            == get_field_type(datum[field])
-                        ):
-                            self.log.info(
-                                "WARNING! Data types are inconsistent."
-                                + " Affected column: {0}".format(field)
-                            )
-                            result[field][EC.QBC_FIELD_TYPE] = inconsistent_data_type
-
-                    else:
-                        # First iteration with this column. Add to result.
-                        result.update(
-                            {field: {EC.QBC_FIELD_TYPE: get_field_type(datum[field])}}
-                        )
+        inconsistent_columns = []
+        for (field, types) in field_types.items():
+            if types is None:
+                # Type is appropriate string type & QBC_FIELD_HASH is true
+                result[field] = {
+                    EC.QBC_FIELD_TYPE: type_mapping.get(str) or inconsistent_data_type,
+                    EC.QBC_FIELD_HASH: True,
+                }
+                continue
+            dwh_types = set(
+                [type_mapping.get(_type) or inconsistent_data_type for _type in types]
+            )
+            if len(dwh_types) == 1:
+                result[field] = {EC.QBC_FIELD_TYPE: dwh_types.pop()}
+            else:
+                inconsistent_columns.append(field)
+                result[field] = {EC.QBC_FIELD_TYPE: inconsistent_data_type}
+
+        if inconsistent_columns:
+            self.log.info(
+                "WARNING! Data types are inconsistent. Affected columns: {0}".format(
+                    ", ".join(inconsistent_columns)
+                )
+            )
         return result
 
     def upload_data(self, data=None, columns_definition=None):
@@ -495,20 +619,17 @@ class EWAHBaseOperator(BaseOperator):
         if self.add_metadata or self.rename_columns:
             if self.add_metadata:
                 self.log.info("Adding metadata...")
-                metadata = copy.deepcopy(self._metadata)  # from individual operator
-                # for all operators alike
-                metadata.update(
-                    {
-                        "_ewah_executed_at": self._execution_time,
-                        "_ewah_execution_chunk": self.upload_call_count,
-                        "_ewah_dag_id": self._context["dag"].dag_id,
-                        "_ewah_dag_run_id": self._context["run_id"],
-                        "_ewah_dag_run_execution_date": self._context["execution_date"],
-                        "_ewah_dag_run_next_execution_date": self._context[
-                            "next_execution_date"
-                        ],
-                    }
-                )
+                # metadata values are scalars, a shallow copy suffices
+                metadata = {
+                    **self._metadata,  # from individual operator
+                    # for all operators alike
+                    "_ewah_executed_at": self._execution_time,
+                    "_ewah_execution_chunk": self.upload_call_count,
+                    "_ewah_dag_id": self._context["dag"].dag_id,
+                    "_ewah_dag_run_id": self._context["run_id"],
+                    "_ewah_dag_run_execution_date": self._execution_date,
+                    "_ewah_dag_run_next_execution_date": self._next_execution_date,
+                }
             rename_columns = self.rename_columns or {}
             for datum in data:
                 if self.add_metadata:
@@ -539,42 +660,84 @@ class EWAHBaseOperator(BaseOperator):
                     )
                 columns_definition[pk_name][EC.QBC_FIELD_PK] = True
 
-        if (self.extract_strategy == EC.ES_INCREMENTAL) or (self.upload_call_count > 1):
-            self.log.info("Checking for, and applying schema changes.")
-            _new_schema_name = self.target_schema_name + self.target_schema_suffix
-            new_cols, del_cols = self.uploader.detect_and_apply_schema_changes(
-                new_schema_name=_new_schema_name,
-                new_table_name=self.target_table_name,
-                new_columns_dictionary=columns_definition,
-                # When introducing a feature utilizing this, remember to
-                #  consider multiple runs within the same execution
-                drop_missing_columns=False and self.upload_call_count == 1,
-                database=self.target_database_name,
-                commit=False,  # Commit only when / after uploading data
-            )
-            self.log.info(
-                "Added fields:\n\t{0}\nDeleted fields:\n\t{1}".format(
-                    "\n\t".join(new_cols) or "\n",
-                    "\n\t".join(del_cols) or "\n",
-                )
+        if self._target_table_exists is False:
+            # Table is created with this upload, there is nothing to change
+            apply_schema_changes = False
+        else:
+            apply_schema_changes = (self.extract_strategy == EC.ES_INCREMENTAL) or (
+                self.upload_call_count > 1
             )
 
         self.log.info("Uploading data now.")
-        self.uploader.create_or_update_table(
-            data=data,
-            columns_definition=columns_definition,
-            table_name=self.target_table_name,
-            schema_name=self.target_schema_name,
-            schema_suffix=self.target_schema_suffix,
-            database_name=self.target_database_name,
-            drop_and_replace=(self.extract_strategy == EC.ES_FULL_REFRESH)
-            and (self.upload_call_count == 1),  # In case of chunking of uploads
-            update_on_columns=self.update_on_columns,
-            commit=False,  # See note below for reason
-            clean_data_before_upload=self.clean_data_before_upload,
-            hash_columns=self.hash_columns,
-            hashlib_func_name=self.hashlib_func_name,
+        drop_and_replace = (self.extract_strategy == EC.ES_FULL_REFRESH) and (
+            self.upload_call_count == 1  # In case of chunking of uploads
+        )
+        batch_size = self._OPTIMAL_BATCH_SIZE.get(self.dwh_engine) or len(data)
+        while data:
+            batch = data[:batch_size]
+            del data[:batch_size]  # Free up memory ASAP
+            self._upload_chunk(
+                data=batch,
+                columns_definition=columns_definition,
+                drop_and_replace=drop_and_replace,
+                apply_schema_changes=apply_schema_changes,
+            )
+            drop_and_replace = False  # only ever drop before the first batch
+            apply_schema_changes = False  # schema is up to date after first batch
+
+    def _apply_schema_changes(self, columns_definition):
+        self.log.info("Checking for, and applying schema changes.")
+        _new_schema_name = self.target_schema_name + self.target_schema_suffix
+        new_cols, del_cols = self.uploader.detect_and_apply_schema_changes(
+            new_schema_name=_new_schema_name,
+            new_table_name=self.target_table_name,
+            new_columns_dictionary=columns_definition,
+            # When introducing a feature utilizing this, remember to
+            #  consider multiple runs within the same execution
+            drop_missing_columns=False and self.upload_call_count == 1,
+            database=self.target_database_name,
+            commit=False,  # Commit only when / after uploading data
+        )
+        self.log.info(
+            "Added fields:\n\t{0}\nDeleted fields:\n\t{1}".format(
+                "\n\t".join(new_cols) or "\n",
+                "\n\t".join(del_cols) or "\n",
+            )
+        )
+
+    def _upload_chunk(
+        self, data, columns_definition, drop_and_replace, apply_schema_changes
+    ):
+        """Upload one batch of data to the DWH."""
+        prepare_kwargs = {
+            "data": data,
+            "columns_definition": columns_definition,
+            "table_name": self.target_table_name,
+            "schema_name": self.target_schema_name,
+            "schema_suffix": self.target_schema_suffix,
+            "database_name": self.target_database_name,
+            "drop_and_replace": drop_and_replace,
+            "update_on_columns": self.update_on_columns,
+            "clean_data_before_upload": self.clean_data_before_upload,
+            "hash_columns": self.hash_columns,
+            "hashlib_func_name": self.hashlib_func_name,
+        }
+        if apply_schema_changes:
+            # Applying schema changes waits on the DWH while cleaning the data
+            # only needs the CPU - do both at the same time. Leaving the with
+            # block waits for the schema changes, also if cleaning fails.
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                schema_future = executor.submit(
+                    self._apply_schema_changes, columns_definition
+                )
+                upload_kwargs = self.uploader.prepare_data_for_upload(**prepare_kwargs)
+            schema_future.result()  # raises any error of the schema changes
+        else:
+            upload_kwargs = self.uploader.prepare_data_for_upload(**prepare_kwargs)
+        self.uploader.upload_prepared_data(
+            upload_kwargs, commit=False  # See note below for reason
         )
+        self._target_table_exists = True
         """ Note on committing changes:
             The hook used for data uploading is created at the beginning of the
             execute function and automatically committed and closed at the end.
@@ -10,10 +10,7 @@ class EWAHDynamoDBOperator(EWAHBaseOperator):
 
     # For incremental loading, use Kinesis Firehose to push changes to S3
     # and use S3 operator instead
-    _ACCEPTED_EXTRACT_STRATEGIES = {
-        EC.ES_FULL_REFRESH: True,
-        EC.ES_INCREMENTAL: False,
-    }
+    _ACCEPTED_EXTRACT_STRATEGIES = frozenset({EC.ES_FULL_REFRESH})
 
     _REQUIRES_COLUMNS_DEFINITION = False
 
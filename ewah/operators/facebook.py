@@ -2,8 +2,6 @@ from ewah.operators.base import EWAHBaseOperator
 from ewah.constants import EWAHConstants as EC
 from ewah.ewah_utils.airflow_utils import datetime_utcnow_with_tz
 
-from ewah.hooks.base import EWAHBaseHook as BaseHook
-
 from facebook_business.api import FacebookAdsApi
 from facebook_business.adobjects.adaccount import AdAccount
 from facebook_business.adobjects.adsinsights import AdsInsights
@@ -18,10 +16,7 @@ class EWAHFBOperator(EWAHBaseOperator):
 
     _NAMES = ["facebook", "fb"]
 
-    _ACCEPTED_EXTRACT_STRATEGIES = {
-        EC.ES_FULL_REFRESH: False,
-        EC.ES_INCREMENTAL: True,
-    }
+    _ACCEPTED_EXTRACT_STRATEGIES = frozenset({EC.ES_INCREMENTAL})
 
     class levels:
         ad = "ad"
@@ -97,7 +92,18 @@ class EWAHFBOperator(EWAHBaseOperator):
 
         super().__init__(*args, **kwargs)
 
-        credentials = BaseHook.get_connection(self.source_conn_id)
+        self.account_ids = account_ids
+        self.insight_fields = insight_fields
+        self.level = level
+        self.time_increment = time_increment
+        self.breakdowns = breakdowns
+        self.execution_waittime_seconds = execution_waittime_seconds
+        self.pagination_limit = pagination_limit
+        self.async_job_read_frequency_seconds = async_job_read_frequency_seconds
+
+    def _get_credentials(self):
+        # Connection is resolved at execution, not at every DAG parse
+        credentials = self.source_conn
         extra = credentials.extra_dejson
 
         # Note: app_secret is not always required!
@@ -109,21 +115,12 @@ class EWAHFBOperator(EWAHBaseOperator):
                 + "if it is not saved as the connection password!"
             )
 
-        self.credentials = {
+        return {
             "app_id": extra.get("app_id"),
             "app_secret": extra.get("app_secret"),
             "access_token": extra.get("access_token", credentials.password),
         }
 
-        self.account_ids = account_ids
-        self.insight_fields = insight_fields
-        self.level = level
-        self.time_increment = time_increment
-        self.breakdowns = breakdowns
-        self.execution_waittime_seconds = execution_waittime_seconds
-        self.pagination_limit = pagination_limit
-        self.async_job_read_frequency_seconds = async_job_read_frequency_seconds
-
     def _clean_response_data(self, response):
         return [dict(datum) for datum in list(response)]
 
@@ -133,7 +130,7 @@ class EWAHFBOperator(EWAHBaseOperator):
             "until": self.data_until.strftime("%Y-%m-%d"),
         }
 
-        FacebookAdsApi.init(**self.credentials)
+        FacebookAdsApi.init(**self._get_credentials())
         params = {
             "time_range": time_range,
             "time_increment": self.time_increment,
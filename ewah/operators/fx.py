@@ -10,10 +10,7 @@ class EWAHFXOperator(EWAHBaseOperator):
 
     _NAMES = ["fx"]
 
-    _ACCEPTED_EXTRACT_STRATEGIES = {
-        EC.ES_FULL_REFRESH: True,
-        EC.ES_INCREMENTAL: True,
-    }
+    _ACCEPTED_EXTRACT_STRATEGIES = frozenset({EC.ES_FULL_REFRESH, EC.ES_INCREMENTAL})
 
     def __init__(
         self,
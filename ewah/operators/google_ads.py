@@ -13,10 +13,7 @@ class EWAHGoogleAdsOperator(EWAHBaseOperator):
 
     _NAMES = ["gads", "google_ads"]
 
-    _ACCEPTED_EXTRACT_STRATEGIES = {
-        EC.ES_FULL_REFRESH: False,
-        EC.ES_INCREMENTAL: True,
-    }
+    _ACCEPTED_EXTRACT_STRATEGIES = frozenset({EC.ES_INCREMENTAL})
 
     _REQUIRED_KEYS = (
         # You must have a developer_token to use the Google Ads API!
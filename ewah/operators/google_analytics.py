@@ -6,8 +6,6 @@ Accessed 5 March 2019
 from ewah.operators.base import EWAHBaseOperator
 from ewah.constants import EWAHConstants as EC
 
-from ewah.hooks.base import EWAHBaseHook as BaseHook
-
 import json
 import time
 from datetime import timedelta
@@ -19,10 +17,7 @@ class EWAHGAOperator(EWAHBaseOperator):
 
     _NAMES = ["ga", "google_analytics"]
 
-    _ACCEPTED_EXTRACT_STRATEGIES = {
-        EC.ES_FULL_REFRESH: False,
-        EC.ES_INCREMENTAL: True,
-    }
+    _ACCEPTED_EXTRACT_STRATEGIES = frozenset({EC.ES_INCREMENTAL})
 
     _API_CORE_V3 = "core_v3"
     _API_CORE_V4 = "core_v4"
@@ -107,17 +102,6 @@ class EWAHGAOperator(EWAHBaseOperator):
 
         super().__init__(*args, **kwargs)
 
-        credentials = BaseHook.get_connection(self.source_conn_id).extra_dejson
-
-        if not credentials.get("client_secrets"):
-            _msg = "Google Analytics Credentials misspecified!"
-            _msg += " Example of a correct specifidation: {0}".format(
-                json.dumps(self._SAMPLE_JSON)
-            )
-            for key in self._SAMPLE_JSON["client_secrets"]:
-                if not key in credentials:
-                    raise Exception(_msg)
-
         if len(dimensions) > 7:
             raise Exception(
                 (
@@ -140,7 +124,16 @@ class EWAHGAOperator(EWAHBaseOperator):
             raise Exception("Please specify a page size equal to or lower than 10000.")
 
     def ewah_execute(self, context):
+        # Connection is resolved at execution, not at every DAG parse
         credentials = self.source_conn.extra_dejson
+        if not credentials.get("client_secrets"):
+            _msg = "Google Analytics Credentials misspecified!"
+            _msg += " Example of a correct specifidation: {0}".format(
+                json.dumps(self._SAMPLE_JSON)
+            )
+            for key in self._SAMPLE_JSON["client_secrets"]:
+                if not key in credentials:
+                    raise Exception(_msg)
         credentials = credentials.get("client_secrets", credentials)
         self.log.info("Connecting to Google...")
         if self.api == self._API_CORE_V3:
@@ -18,10 +18,12 @@ class EWAHGMapsOperator(EWAHBaseOperator):
 
     _NAMES = ["gmaps", "google_maps", "googlemaps"]
 
-    _ACCEPTED_EXTRACT_STRATEGIES = {
-        EC.ES_FULL_REFRESH: True,
-        EC.ES_INCREMENTAL: True,  # use templating for incremental usecases
-    }
+    _ACCEPTED_EXTRACT_STRATEGIES = frozenset(
+        {
+            EC.ES_FULL_REFRESH,
+            EC.ES_INCREMENTAL,  # use templating for incremental usecases
+        }
+    )
 
     def __init__(self, address_sql, *args, **kwargs):
         self.template_fields.add("address_sql")
@@ -1,8 +1,6 @@
 from ewah.operators.base import EWAHBaseOperator
 from ewah.constants import EWAHConstants as EC
 
-from ewah.hooks.base import EWAHBaseHook as BaseHook
-
 import gspread
 import json
 from oauth2client.service_account import ServiceAccountCredentials as SAC
@@ -12,10 +10,7 @@ class EWAHGSpreadOperator(EWAHBaseOperator):
 
     _NAMES = ["google_sheets", "gs", "gsheets"]
 
-    _ACCEPTED_EXTRACT_STRATEGIES = {
-        EC.ES_FULL_REFRESH: True,
-        EC.ES_INCREMENTAL: False,
-    }
+    _ACCEPTED_EXTRACT_STRATEGIES = frozenset({EC.ES_FULL_REFRESH})
 
     _REQUIRES_COLUMNS_DEFINITION = True
 
@@ -65,17 +60,6 @@ class EWAHGSpreadOperator(EWAHBaseOperator):
     ):
         super().__init__(*args, **kwargs)
 
-        credentials = BaseHook.get_connection(self.source_conn_id).extra_dejson
-        credentials = credentials.get("client_secrets", credentials)
-
-        _msg = "Google Service Account Credentials misspecified!"
-        _msg += " Example of a correct specifidation: {0}".format(
-            json.dumps(self._SAMPLE_JSON)
-        )
-        for key in self._SAMPLE_JSON["client_secrets"]:
-            if not key in credentials:
-                raise Exception(_msg)
-
         column_match = {}
         for col_key, col_def in self.columns_definition.items():
             if (not col_def) or (not col_def.get(EC.QBC_FIELD_GSHEET_COLNO)):
@@ -93,7 +77,6 @@ class EWAHGSpreadOperator(EWAHBaseOperator):
                 }
             )
 
-        self.client_secrets = credentials
         self.column_match = column_match
         self.workbook_key = workbook_key
         self.sheet_key = sheet_key
@@ -101,9 +84,21 @@ class EWAHGSpreadOperator(EWAHBaseOperator):
         self.end_row = end_row
 
     def ewah_execute(self, context):
+        # Connection is resolved at execution, not at every DAG parse
+        credentials = self.source_conn.extra_dejson
+        credentials = credentials.get("client_secrets", credentials)
+
+        _msg = "Google Service Account Credentials misspecified!"
+        _msg += " Example of a correct specifidation: {0}".format(
+            json.dumps(self._SAMPLE_JSON)
+        )
+        for key in self._SAMPLE_JSON["client_secrets"]:
+            if not key in credentials:
+                raise Exception(_msg)
+
         client = gspread.authorize(
             SAC.from_json_keyfile_dict(
-                self.client_secrets,
+                credentials,
                 ["https://spreadsheets.google.com/feeds"],
             ),
         )
@@ -8,10 +8,7 @@ class EWAHHubspotOperator(EWAHBaseOperator):
 
     _NAMES = ["hubspot"]
 
-    _ACCEPTED_EXTRACT_STRATEGIES = {
-        EC.ES_FULL_REFRESH: True,
-        EC.ES_INCREMENTAL: False,
-    }
+    _ACCEPTED_EXTRACT_STRATEGIES = frozenset({EC.ES_FULL_REFRESH})
 
     _REQUIRES_COLUMNS_DEFINITION = False
 
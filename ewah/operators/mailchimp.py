@@ -8,20 +8,24 @@ class EWAHMailchimpOperator(EWAHBaseOperator):
 
     _NAMES = ["mailchimp", "mc"]
 
-    _ACCEPTED_EXTRACT_STRATEGIES = {
-        EC.ES_FULL_REFRESH: True,
-        EC.ES_INCREMENTAL: False,
-    }
+    _ACCEPTED_EXTRACT_STRATEGIES = frozenset({EC.ES_FULL_REFRESH})
 
     _REQUIRES_COLUMNS_DEFINITION = False
 
     _CONN_TYPE = EWAHMailchimpHook.conn_type
 
-    def __init__(self, resource=None, *args, **kwargs):
+    def __init__(self, resource=None, batch_size=1000, max_workers=4, *args, **kwargs):
         # use target table name as resource if none is given (-> easier config)
         self.resource = resource or kwargs.get("target_table_name")
+        self.batch_size = batch_size
+        self.max_workers = max_workers
         super().__init__(*args, **kwargs)
 
     def ewah_execute(self, context):
-        for batch in self.source_hook.get_data_in_batches(resource=self.resource):
+        # Pages are fetched concurrently, but uploaded one by one
+        for batch in self.source_hook.get_data_in_batches(
+            resource=self.resource,
+            batch_size=self.batch_size,
+            max_workers=self.max_workers,
+        ):
             self.upload_data(batch)
@@ -6,10 +6,7 @@ class EWAHMongoDBOperator(EWAHBaseOperator):
 
     _NAMES = ["mongo", "mongodb"]
 
-    _ACCEPTED_EXTRACT_STRATEGIES = {
-        EC.ES_FULL_REFRESH: True,
-        EC.ES_INCREMENTAL: True,
-    }
+    _ACCEPTED_EXTRACT_STRATEGIES = frozenset({EC.ES_FULL_REFRESH, EC.ES_INCREMENTAL})
 
     _REQUIRES_COLUMNS_DEFINITION = False
 
@@ -9,10 +9,7 @@ class EWAHPipedriveOperator(EWAHBaseOperator):
 
     _NAMES = ["pd", "pipedrive"]
 
-    _ACCEPTED_EXTRACT_STRATEGIES = {
-        EC.ES_FULL_REFRESH: True,
-        EC.ES_INCREMENTAL: False,
-    }
+    _ACCEPTED_EXTRACT_STRATEGIES = frozenset({EC.ES_FULL_REFRESH})
 
     _CONN_TYPE = EWAHPipedriveHook.conn_type
 
@@ -2,23 +2,302 @@ from ewah.operators.base import EWAHBaseOperator
 from ewah.constants import EWAHConstants as EC
 
 from airflow.providers.amazon.aws.hooks.s3 import S3Hook
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import partial
+from itertools import islice
 
+import bz2
+import codecs
+import io
 import json
+import multiprocessing
 import csv
 import gzip
+import re
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa = None
+
+# Large objects are downloaded with this many concurrent ranged GETs each
+_TRANSFER_MAX_CONCURRENCY = 10
+
+_BOM = b"\xef\xbb\xbf"
+
+_WHITESPACE = re.compile(r"\s*")
+
+# Compression of files by the suffix of their key, if decompress="infer"
+_COMPRESSION_SUFFIXES = {
+    ".gz": "gzip",
+    ".gzip": "gzip",
+    ".bz2": "bz2",
+    ".zst": "zstd",
+}
+_COMPRESSIONS = frozenset(_COMPRESSION_SUFFIXES.values())
+
+# CompressionType of S3 Select by compression, S3 Select does not support zstd
+_SELECT_COMPRESSION_TYPES = {None: "NONE", "gzip": "GZIP", "bz2": "BZIP2"}
+
+# S3 Select CSV input serialization options by csv_format_options
+_SELECT_CSV_FORMAT_OPTIONS = {
+    "delimiter": "FieldDelimiter",
+    "quotechar": "QuoteCharacter",
+    "escapechar": "QuoteEscapeCharacter",
+}
+
+
+def _open_stream(raw_data, compression=None):
+    "Return a binary file object of the raw bytes, decompressed as it is read."
+    stream = io.BytesIO(raw_data)
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=stream)
+    if compression == "bz2":
+        return bz2.BZ2File(stream)
+    if compression == "zstd":
+        # zstandard's stream reader can't seek backwards, which _load_csv does
+        reader = zstandard.ZstdDecompressor().stream_reader(stream)
+        return io.BytesIO(reader.read())
+    return stream
+
+
+def _iter_concatenated_json(text):
+    "Yield the objects of a string of concatenated JSON objects, e.g. {..}{..}."
+    decoder = json.JSONDecoder()
+    idx = _WHITESPACE.match(text).end()
+    while idx < len(text):
+        obj, idx = decoder.raw_decode(text, idx)
+        yield obj
+        idx = _WHITESPACE.match(text, idx).end()
+
+
+def _iter_csv_records(text, fieldnames=None, restkey=None, restval=None, **kwargs):
+    """Yield the rows of a CSV file as dicts, like iterating a csv.DictReader.
+
+    Uses a csv.reader and zips each row with a tuple of the field names.
+    """
+    reader = csv.reader(text, **kwargs)
+    if fieldnames is None:
+        fieldnames = next(reader, None)
+        if fieldnames is None:
+            return  # empty file
+    fieldnames = tuple(fieldnames)
+    n_fields = len(fieldnames)
+    for row in reader:
+        if not row:
+            continue  # csv.DictReader skips empty rows, too
+        record = dict(zip(fieldnames, row))
+        n_values = len(row)
+        if n_values > n_fields:
+            record[restkey] = row[n_fields:]
+        elif n_values < n_fields:
+            for key in fieldnames[n_values:]:
+                record[key] = restval
+        yield record
+
+
+def _parse_json(raw_data):
+    "Return the object of the bytes of a JSON file."
+    if orjson is not None:
+        try:
+            return orjson.loads(raw_data)
+        except orjson.JSONDecodeError:
+            pass  # e.g. NaN or integers above 64 bit, which json accepts
+    # S3Hook.read_key() decodes as utf-8, too
+    return json.loads(raw_data.decode("utf-8"))
+
+
+def _parse_concatenated_json(raw_data):
+    "Return an iterator of the objects of the bytes of concatenated JSON objects."
+    return _iter_concatenated_json(raw_data.decode("utf-8"))
+
+
+def _iter_ijson_items(stream, prefix, f_fallback, **kwargs):
+    """Yield the items of a stream parsed with ijson.
+
+    ijson rejects some files that the json module accepts, e.g. with NaN or
+    without any concatenated records. The stream is then parsed again with
+    f_fallback, skipping the records that were already yielded.
+    """
+    n_records = 0
+    try:
+        # use_float: parse numbers like the json module instead of as Decimal
+        for record in ijson.items(stream, prefix, use_float=True, **kwargs):
+            n_records += 1
+            yield record
+    except ijson.JSONError:
+        stream.seek(0)
+        yield from islice(f_fallback(stream.read()), n_records, None)
+
+
+def _load_json(stream):
+    """Return an iterator of the records of a JSON file with a list of records.
+
+    If ijson is installed, the records are parsed incrementally from the bytes
+    instead of decoding and parsing the entire file at once. Otherwise, orjson is
+    used to parse the file if it is installed.
+    """
+    if ijson is None:
+        return iter(_parse_json(stream.read()))
+    return _iter_ijson_items(stream, "item", _parse_json)
+
+
+def _load_firehose_json(stream):
+    "Return an iterator of the records of a file of concatenated JSON records."
+    if ijson is None:
+        return _parse_concatenated_json(stream.read())
+    return _iter_ijson_items(stream, "", _parse_concatenated_json, multiple_values=True)
+
+
+# Functions to load the records of a file by file format, except for CSV files
+_FORMAT_DISPATCH = {
+    "JSON": _load_json,
+    "AWS_FIREHOSE_JSON": _load_firehose_json,
+}
+
+
+# csv_format_options that can be translated to pyarrow's CSV options
+_ARROW_CSV_FORMAT_OPTIONS = frozenset(
+    {
+        "delimiter",
+        "doublequote",
+        "escapechar",
+        "fieldnames",
+        "lineterminator",  # ignored by csv readers, too
+        "quotechar",
+        "quoting",
+    }
+)
+
+
+def _iter_csv_records_arrow(
+    stream,
+    encoding,
+    fieldnames=None,
+    delimiter=",",
+    quotechar='"',
+    doublequote=True,
+    escapechar=None,
+    quoting=csv.QUOTE_MINIMAL,
+    lineterminator=None,
+):
+    """Yield the rows of a CSV file as dicts, parsed with pyarrow.
+
+    Like the csv module, all values are strings. Unlike the csv module, rows with
+    more or less values than the header raise an error.
+    """
+    start = stream.tell()
+    if not stream.read(1):
+        return  # empty file
+    stream.seek(start)
+    read_options = pa_csv.ReadOptions(encoding=encoding, column_names=fieldnames)
+    parse_options = pa_csv.ParseOptions(
+        delimiter=delimiter,
+        quote_char=False if quoting == csv.QUOTE_NONE else quotechar,
+        double_quote=doublequote,
+        escape_char=escapechar or False,
+        newlines_in_values=True,
+    )
+    # Read the column names first to then read all columns as strings, pyarrow
+    # would otherwise infer the data types
+    try:
+        column_names = pa_csv.open_csv(
+            stream, read_options=read_options, parse_options=parse_options
+        ).schema.names
+    except pa.ArrowInvalid:
+        # pyarrow fails on a single line without line break, i.e. a header only
+        stream.seek(start)
+        content = stream.read()
+        if fieldnames is None and not (b"\n" in content or b"\r" in content):
+            return
+        raise
+    stream.seek(start)
+    convert_options = pa_csv.ConvertOptions(
+        column_types={name: pa.string() for name in column_names}
+    )
+    reader = pa_csv.open_csv(
+        stream,
+        read_options=read_options,
+        parse_options=parse_options,
+        convert_options=convert_options,
+    )
+    for batch in reader:
+        yield from batch.to_pylist()
+
+
+def _load_csv(
+    stream,
+    csv_encoding="utf-8",
+    use_pyarrow=False,
+    csv_format_options={},
+):
+    """Return an iterator of the rows of a CSV file as dicts.
+
+    The file is decoded as it is read.
+    """
+    # remove BOM if it exists
+    # also, if file has a BOM, it is 99.9% utf-8 encoded!
+    if stream.read(3) == _BOM:
+        encoding = "utf-8"
+        if not encoding == csv_encoding:
+            # there may be a BOM while still not utf-8 -> use the
+            # given csv_encoding argument if so
+            decoder = codecs.getincrementaldecoder(encoding)()
+            try:
+                for chunk in iter(lambda: stream.read(1 << 20), b""):
+                    decoder.decode(chunk)
+                decoder.decode(b"", final=True)
+            except UnicodeDecodeError:
+                encoding = csv_encoding
+            stream.seek(3)
+    else:
+        stream.seek(0)
+        encoding = csv_encoding
+    if use_pyarrow:
+        return _iter_csv_records_arrow(stream, encoding, **csv_format_options)
+    text = io.TextIOWrapper(stream, encoding=encoding, newline="")
+    return _iter_csv_records(text, **csv_format_options)
+
+
+def _load_records(f_load, raw_data, compression):
+    "Return the records of a file as list, e.g. to return them from a process."
+    return list(f_load(_open_stream(raw_data, compression)))
 
 
 class EWAHS3Operator(EWAHBaseOperator):
-    """Only implemented for JSON and CSV files from S3 right now!"""
+    """Only implemented for JSON and CSV files from S3 right now!
+
+    Records are uploaded in batches of up to upload_batch_rows records of one file,
+    such that the file metadata columns stay last. Files are parsed as the batches
+    are filled. With parse_workers,
+    files are parsed in separate processes instead, holding up to twice as many
+    parsed files in memory.
+    """
 
     _NAMES = ["s3"]
 
-    _ACCEPTED_EXTRACT_STRATEGIES = {
-        EC.ES_FULL_REFRESH: True,
-        EC.ES_INCREMENTAL: True,
-    }
+    _ACCEPTED_EXTRACT_STRATEGIES = frozenset({EC.ES_FULL_REFRESH, EC.ES_INCREMENTAL})
 
     _IMPLEMENTED_FORMATS = [
         "JSON",
@@ -26,7 +305,9 @@ class EWAHS3Operator(EWAHBaseOperator):
         "CSV",
     ]
 
-    _BOM = b"\xef\xbb\xbf"
+    _BATCHES_AHEAD = 2  # parse up to this many batches while uploading a batch
+
+    _SUPPORTS_CLONE = True
 
     def __init__(
         self,
@@ -37,7 +318,15 @@ class EWAHS3Operator(EWAHBaseOperator):
         key_name=None,  # if not specified, uses data_from and data_until
         csv_format_options={},
         csv_encoding="utf-8",
-        decompress=False,
+        decompress=False,  # True (gzip), a codec, or "infer" from the key suffix
+        use_pyarrow=False,  # parse CSVs with pyarrow, needs pyarrow installed
+        max_concurrency=16,  # number of objects to download at the same time
+        small_file_threshold_bytes=8 << 20,  # smaller files are read with one GET
+        multipart_chunksize_bytes=16 << 20,  # size of ranged GETs of larger files
+        list_shards=None,  # optional list of sub-prefixes to list concurrently
+        parse_workers=None,  # number of processes to parse files in, if any
+        s3_select_expression=None,  # SQL to select records with S3 Select
+        upload_batch_rows=50000,  # upload the records of a file in batches
         *args,
         **kwargs
     ):
@@ -59,8 +348,74 @@ class EWAHS3Operator(EWAHBaseOperator):
         if not file_format == "CSV" and csv_format_options:
             raise Exception("csv_format_options is only valid for CSV files!")
 
-        if decompress and not file_format == "CSV":
-            raise exception("Can currently only decompress CSVs!")
+        if list_shards:
+            _msg = "list_shards must be a list of non-empty strings!"
+            assert all(shard and isinstance(shard, str) for shard in list_shards), _msg
+            list_shards = sorted(set(list_shards))
+            for (shard, next_shard) in zip(list_shards, list_shards[1:]):
+                if next_shard.startswith(shard):
+                    raise Exception(
+                        "list_shards must not overlap: {0} and {1}".format(
+                            shard, next_shard
+                        )
+                    )
+
+        for size in (small_file_threshold_bytes, multipart_chunksize_bytes):
+            _msg = "Chunk sizes and thresholds must be positive integers!"
+            assert isinstance(size, int) and size > 0, _msg
+
+        _msg = "upload_batch_rows must be a positive integer!"
+        assert isinstance(upload_batch_rows, int) and upload_batch_rows > 0, _msg
+
+        if parse_workers is not None:
+            _msg = "parse_workers must be a positive integer!"
+            assert isinstance(parse_workers, int) and parse_workers > 0, _msg
+
+        if s3_select_expression:
+            if use_pyarrow:
+                raise Exception("Cannot use both use_pyarrow and s3_select_expression!")
+            if decompress == "zstd":
+                raise Exception("S3 Select does not support zstd compression!")
+            if file_format == "CSV":
+                if not codecs.lookup(csv_encoding).name == "utf-8":
+                    raise Exception("S3 Select only supports utf-8 encoded CSVs!")
+                unsupported = set(csv_format_options) - set(_SELECT_CSV_FORMAT_OPTIONS)
+                if unsupported:
+                    raise Exception(
+                        "csv_format_options not supported with s3_select_"
+                        + "expression: {0}".format(", ".join(sorted(unsupported)))
+                    )
+
+        if use_pyarrow:
+            if not file_format == "CSV":
+                raise Exception("use_pyarrow is only valid for CSV files!")
+            if pa is None:
+                raise Exception("use_pyarrow requires pyarrow to be installed!")
+            unsupported = set(csv_format_options) - _ARROW_CSV_FORMAT_OPTIONS
+            if csv_format_options.get("quoting", csv.QUOTE_MINIMAL) not in (
+                csv.QUOTE_MINIMAL,
+                csv.QUOTE_ALL,
+                csv.QUOTE_NONE,
+            ):
+                unsupported.add("quoting")
+            if unsupported:
+                raise Exception(
+                    "csv_format_options not supported with use_pyarrow: {0}".format(
+                        ", ".join(sorted(unsupported))
+                    )
+                )
+
+        if decompress is True:
+            decompress = "gzip"  # backwards compatibility
+        elif not decompress:
+            decompress = None
+        elif not decompress == "infer":
+            _msg = "decompress must be one of: True, False, infer, {0}".format(
+                ", ".join(sorted(_COMPRESSIONS))
+            )
+            assert decompress in _COMPRESSIONS, _msg
+            if decompress == "zstd" and zstandard is None:
+                raise Exception("decompress=zstd requires zstandard to be installed!")
 
         self.bucket_name = bucket_name
         self.prefix = prefix
@@ -70,35 +425,231 @@ class EWAHS3Operator(EWAHBaseOperator):
         self.csv_format_options = csv_format_options
         self.csv_encoding = csv_encoding
         self.decompress = decompress
+        self.use_pyarrow = use_pyarrow
+        self.max_concurrency = max_concurrency
+        self.small_file_threshold_bytes = small_file_threshold_bytes
+        self.multipart_chunksize_bytes = multipart_chunksize_bytes
+        self.list_shards = list_shards
+        self.parse_workers = parse_workers
+        self.s3_select_expression = s3_select_expression
+        self.upload_batch_rows = upload_batch_rows
+
+    def _get_client(self):
+        """Return the S3 client to use for all requests of an execution.
+
+        Its connection pool fits all concurrent downloads. Throttling by S3 is
+        retried with adaptive rate limiting. Both are merged into the config of
+        the connection, if any, e.g. from config_kwargs in its extra.
+        """
+        hook = S3Hook(self.source_conn.conn_id)
+        # the hook only reads config_kwargs when creating a client without config
+        config_kwargs = self.source_conn.extra_dejson.get("config_kwargs")
+        if config_kwargs:
+            hook_config = Config(**config_kwargs)
+        else:
+            hook_config = hook.config or Config()
+        return hook.get_client_type(
+            "s3",
+            config=hook_config.merge(
+                Config(
+                    max_pool_connections=self.max_concurrency
+                    * _TRANSFER_MAX_CONCURRENCY,
+                    retries={"max_attempts": 10, "mode": "adaptive"},
+                )
+            ),
+        )
+
+    def _iterate_through_bucket(self, client, bucket, prefix):
+        """Yield all objects of the bucket with the prefix.
+
+        If list_shards is set, only objects with the prefix followed by one of the
+        shards are listed, concurrently per shard, e.g. for shards 0-9 and a-f for
+        keys starting with a hexadecimal hash. Objects are in the order of the keys.
+        """
+        if not self.list_shards:
+            for item in self._iterate_through_prefix(client, bucket, prefix):
+                yield item
+            return
 
-    def _iterate_through_bucket(self, s3hook, bucket, prefix):
+        def list_shard(shard):
+            return list(self._iterate_through_prefix(client, bucket, prefix + shard))
+
+        with ThreadPoolExecutor(
+            max_workers=min(len(self.list_shards), self.max_concurrency)
+        ) as executor:
+            # list_shards is sorted
+            for items in executor.map(list_shard, self.list_shards):
+                for item in items:
+                    yield item
+
+    def _iterate_through_prefix(self, client, bucket, prefix):
         """The bucket.objects.filter() method only returns a max of 1000
         objects. If more objects are in an S3 bucket, pagniation is
         required. See also: https://stackoverflow.com/questions/44238525/how-to-iterate-over-files-in-an-s3-bucket
         """
-        cli = s3hook.get_client_type("s3")
-        paginator = cli.get_paginator("list_objects_v2")
-        page_iterator = paginator.paginate(Bucket=bucket, Prefix=prefix)
+        paginator = client.get_paginator("list_objects_v2")
+        page_iterator = paginator.paginate(
+            Bucket=bucket,
+            Prefix=prefix,
+            PaginationConfig={"PageSize": 1000},
+        )
 
         for page in page_iterator:
             if page["KeyCount"] > 0:
                 for item in page["Contents"]:
                     yield item
 
-    def ewah_execute(self, context):
-        if self.file_format == "JSON":
-            return self.execute_json(
-                context=context,
-                f_get_data=lambda hook, key, bucket: json.loads(
-                    hook.read_key(key, bucket)
-                ),
+    def _get_objects_to_load(self, client):
+        """Yield all objects of the bucket that are within the loading scope.
+
+        Objects are the dicts of the listing, with "Key" and "LastModified" - no
+        additional request is made per object.
+        """
+        # local names for the loop below, which may run for millions of objects
+        suffix = self.suffix
+        data_from = self.data_from
+        data_until = self.data_until
+        objects = self._iterate_through_bucket(
+            client=client,
+            bucket=self.bucket_name,
+            prefix=self.prefix,
+        )
+        for obj in objects:
+            # skip all files outside of loading scope
+            if suffix and not obj["Key"].endswith(suffix):
+                continue
+            if data_from and (obj["LastModified"] < data_from):
+                continue
+            if data_until and (obj["LastModified"] >= data_until):
+                continue
+            yield obj
+
+    def _download_key(self, client, key, size=None):
+        """Download the content of a key as bytes.
+
+        If the size is known from the listing and small, the object is read with a
+        single GET. Otherwise, download_fileobj gets the size with a HEAD request
+        and downloads large objects with concurrent ranged GETs.
+        """
+        if self.s3_select_expression:
+            return self._select_key(client, key)
+        if size is not None and size < self.small_file_threshold_bytes:
+            return client.get_object(Bucket=self.bucket_name, Key=key)["Body"].read()
+        buffer = io.BytesIO()
+        client.download_fileobj(
+            self.bucket_name,
+            key,
+            buffer,
+            Config=TransferConfig(
+                multipart_threshold=self.small_file_threshold_bytes,
+                multipart_chunksize=self.multipart_chunksize_bytes,
+                max_concurrency=_TRANSFER_MAX_CONCURRENCY,
+                io_chunksize=1 << 20,
+            ),
+        )
+        return buffer.getvalue()
+
+    def _select_key(self, client, key):
+        """Return the records selected from a key with S3 Select as bytes.
+
+        The records are JSON objects separated by line breaks. S3 Select parses and
+        decompresses the file, such that only the selected records are downloaded.
+        """
+        compression = self._get_compression(key)
+        if compression not in _SELECT_COMPRESSION_TYPES:
+            raise Exception(
+                "S3 Select does not support {0} compression: {1}".format(
+                    compression, key
+                )
+            )
+        if self.file_format == "CSV":
+            input_serialization = {
+                "CSV": {
+                    _SELECT_CSV_FORMAT_OPTIONS[option]: value
+                    for (option, value) in self.csv_format_options.items()
+                }
+            }
+            input_serialization["CSV"].update(
+                {"FileHeaderInfo": "USE", "AllowQuotedRecordDelimiter": True}
+            )
+        else:
+            # DOCUMENT also reads concatenated JSON objects
+            input_serialization = {"JSON": {"Type": "DOCUMENT"}}
+        input_serialization["CompressionType"] = _SELECT_COMPRESSION_TYPES[compression]
+        response = client.select_object_content(
+            Bucket=self.bucket_name,
+            Key=key,
+            ExpressionType="SQL",
+            Expression=self.s3_select_expression,
+            InputSerialization=input_serialization,
+            OutputSerialization={"JSON": {"RecordDelimiter": "\n"}},
+        )
+        return b"".join(
+            event["Records"]["Payload"]
+            for event in response["Payload"]
+            if "Records" in event
+        )
+
+    def _download_objects(self, client, objects):
+        """Yield tuples of (object, content as bytes) in the order of objects.
+
+        Downloads up to max_concurrency objects at the same time while the caller
+        processes the previous objects.
+        """
+        # boto3 clients are thread-safe, resources aren't
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            for obj in objects:
+                future = executor.submit(
+                    self._download_key, client, obj["Key"], obj.get("Size")
+                )
+                pending.append((obj, future))
+                if len(pending) >= self.max_concurrency:
+                    obj, future = pending.popleft()
+                    yield (obj, future.result())
+            while pending:
+                obj, future = pending.popleft()
+                yield (obj, future.result())
+
+    @staticmethod
+    def _batch_records(records, batch_size, file_metadata={}):
+        "Yield tuples of (file metadata, list of up to batch_size records)."
+        while True:
+            data = list(islice(records, batch_size))
+            if not data:
+                return
+            yield (file_metadata, data)
+
+    def _upload_in_batches(self, batches):
+        """Upload an iterator of tuples of (file metadata, list of records).
+
+        The next batches are parsed in a thread while uploading a batch. A single
+        worker thread consumes batches, in order.
+        """
+
+        def next_batch():
+            return next(batches, (None, None))
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = deque(
+                [executor.submit(next_batch) for _ in range(self._BATCHES_AHEAD)]
             )
-        elif self.file_format == "AWS_FIREHOSE_JSON":
+            while True:
+                (file_metadata, data) = pending.popleft().result()
+                if data is None:
+                    break
+                pending.append(executor.submit(next_batch))
+                self._metadata.update(file_metadata)
+                self.upload_data(data=data)
+
+    def ewah_execute(self, context):
+        if self.s3_select_expression:
+            # S3 Select returns the records as JSON, regardless of the file format
+            return self.execute_json(context=context, f_load=_load_firehose_json)
+        elif self.file_format in _FORMAT_DISPATCH:
             return self.execute_json(
                 context=context,
-                f_get_data=lambda hook, key, bucket: json.loads(
-                    "[" + hook.read_key(key, bucket).replace("}{", "},{") + "]"
-                ),
+                f_load=_FORMAT_DISPATCH[self.file_format],
             )
         elif self.file_format == "CSV":
             return self.execute_csv(
@@ -107,116 +658,100 @@ class EWAHS3Operator(EWAHBaseOperator):
         else:
             raise Exception("File format not implemented!")
 
+    def _get_compression(self, key):
+        "Return the compression of a key's file, or None if it is not compressed."
+        if not self.decompress == "infer":
+            return self.decompress
+        for (suffix, compression) in _COMPRESSION_SUFFIXES.items():
+            if key.endswith(suffix):
+                if compression == "zstd" and zstandard is None:
+                    raise Exception(
+                        "{0} requires zstandard to be installed!".format(key)
+                    )
+                return compression
+        return None
+
+    def _get_stream_compression(self, key):
+        "Return the compression of the downloaded bytes of a key."
+        if self.s3_select_expression:
+            return None  # S3 Select returns uncompressed records
+        return self._get_compression(key)
+
     def execute_csv(self, context):
-        hook = S3Hook(self.source_conn.conn_id)
-        suffix = self.suffix
-        if self.key_name:
-            obj = hook.get_key(self.key_name, self.bucket_name)
-            raw_data = obj.get()["Body"].read()
-            if self.decompress:
-                raw_data = gzip.decompress(raw_data)
-            if raw_data[:3] == self._BOM:
-                raw_data = raw_data[3:]
-                csv_encoding = "utf-8"
-            else:
-                csv_encoding = self.csv_encoding
-            try:
-                raw_data = raw_data.decode(csv_encoding).splitlines()
-            except UnicodeDecodeError:
-                if csv_encoding == self.csv_encoding:
-                    raise
-                raw_data = raw_data.decode(self.csv_encoding).splitlines()
-            reader = csv.DictReader(raw_data, **self.csv_format_options)
-            data = list(reader)
-            self.upload_data(data=data)
-        else:
-            objects = self._iterate_through_bucket(
-                s3hook=hook,
-                bucket=self.bucket_name,
-                prefix=self.prefix,
-            )
-            for obj_iter in objects:
-                # skip all files outside of loading scope
-                obj = hook.get_key(obj_iter["Key"], self.bucket_name)
-                if self.data_from and (obj.last_modified < self.data_from):
-                    continue
-                if self.data_until and (obj.last_modified >= self.data_until):
-                    continue
-                if suffix and not suffix == obj.key[-len(suffix) :]:
-                    continue
-
-                self.log.info("Loading data from file {0}".format(obj.key))
-                raw_data = obj.get()["Body"].read()
-                if self.decompress:
-                    raw_data = gzip.decompress(raw_data)
-                # remove BOM if it exists
-                # also, if file has a BOM, it is 99.9% utf-8 encoded!
-                if raw_data[:3] == self._BOM:
-                    raw_data = raw_data[3:]
-                    csv_encoding = "utf-8"
-                else:
-                    csv_encoding = self.csv_encoding
-                # there may be a BOM while still not utf-8 -> use the
-                # given csv_encoding argument if so
-                try:
-                    raw_data = raw_data.decode(csv_encoding).splitlines()
-                except UnicodeDecodeError:
-                    if csv_encoding == self.csv_encoding:
-                        raise
-                    raw_data = raw_data.decode(self.csv_encoding).splitlines()
-                reader = csv.DictReader(raw_data, **self.csv_format_options)
-                data = list(reader)
-                self._metadata.update(
-                    {
-                        "bucket_name": self.bucket_name,
-                        "file_name": obj.key,
-                        "file_last_modified": str(obj.last_modified),
-                    }
+        f_load = partial(
+            _load_csv,
+            csv_encoding=self.csv_encoding,
+            use_pyarrow=self.use_pyarrow,
+            csv_format_options=self.csv_format_options,
+        )
+        return self.execute_json(context=context, f_load=f_load)
+
+    def _parse_objects(self, objects, f_load):
+        "Yield tuples of (object, iterator of records) in the order of objects."
+        for (obj, raw_data) in objects:
+            stream = _open_stream(raw_data, self._get_stream_compression(obj["Key"]))
+            yield (obj, f_load(stream))
+
+    def _parse_in_processes(self, objects, f_load):
+        """Yield tuples of (object, iterator of records) in the order of objects.
+
+        Files are parsed in up to parse_workers processes, with up to twice as
+        many parsed files held in memory while the caller uploads the previous ones.
+        The pool is created from the download thread; forking there could copy
+        locks held by other threads into the workers, hence spawn them instead.
+        """
+        pending = deque()
+        max_pending = 2 * self.parse_workers
+        with ProcessPoolExecutor(
+            max_workers=self.parse_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            for (obj, raw_data) in objects:
+                future = executor.submit(
+                    _load_records,
+                    f_load,
+                    raw_data,
+                    self._get_stream_compression(obj["Key"]),
                 )
-                self.upload_data(data=data)
+                pending.append((obj, future))
+                if len(pending) >= max_pending:
+                    obj, future = pending.popleft()
+                    yield (obj, iter(future.result()))
+            while pending:
+                obj, future = pending.popleft()
+                yield (obj, iter(future.result()))
 
-    def execute_json(self, context, f_get_data):
-        hook = S3Hook(self.source_conn.conn_id)
-        suffix = self.suffix
+    def _iter_file_batches(self, objects, batch_size):
+        """Yield the batches of all files of tuples of (object, iterator of records).
+
+        A batch never spans several files, such that the file metadata is added
+        via _metadata, i.e. after the data columns.
+        """
+        for (obj, records) in objects:
+            self.log.info("Loading data from file {0}".format(obj["Key"]))
+            file_metadata = {
+                "file_name": obj["Key"],
+                "file_last_modified": str(obj["LastModified"]),
+            }
+            yield from self._batch_records(records, batch_size, file_metadata)
+
+    def execute_json(self, context, f_load):
+        client = self._get_client()
 
         if self.key_name:
-            data = f_get_data(
-                hook=hook,
-                key=self.key_name,
-                bucket=self.bucket_name,
+            raw_data = self._download_key(client, self.key_name)
+            compression = self._get_stream_compression(self.key_name)
+            stream = _open_stream(raw_data, compression)
+            self._upload_in_batches(
+                self._batch_records(f_load(stream), self.upload_batch_rows)
             )
-            self.upload_data(data=data)
         else:
-            data = []
-            objects = self._iterate_through_bucket(
-                s3hook=hook,
-                bucket=self.bucket_name,
-                prefix=self.prefix,
+            objects = self._download_objects(client, self._get_objects_to_load(client))
+            if self.parse_workers:
+                objects = self._parse_in_processes(objects, f_load)
+            else:
+                objects = self._parse_objects(objects, f_load)
+            self._metadata.update({"bucket_name": self.bucket_name})
+            self._upload_in_batches(
+                self._iter_file_batches(objects, self.upload_batch_rows)
             )
-            for obj_iter in objects:
-                obj = hook.get_key(obj_iter["Key"], self.bucket_name)
-                if self.load_data_from and obj.last_modified < self.load_data_from:
-                    continue
-                if self.load_data_until and obj.last_modified >= self.load_data_until:
-                    continue
-                if suffix and not suffix == obj.key[-len(suffix) :]:
-                    continue
-
-                self.log.info(
-                    "Loading data from file {0}".format(
-                        obj.key,
-                    )
-                )
-                self._metadata.update(
-                    {
-                        "bucket_name": self.bucket_name,
-                        "file_name": obj.key,
-                        "file_last_modified": str(obj.last_modified),
-                    }
-                )
-                data = f_get_data(
-                    hook=hook,
-                    key=obj.key,
-                    bucket=self.bucket_name,
-                )
-                self.upload_data(data=data)
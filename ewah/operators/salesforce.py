@@ -9,10 +9,7 @@ class EWAHSalesforceOperator(EWAHBaseOperator):
 
     _NAMES = ["sf", "salesforce"]
 
-    _ACCEPTED_EXTRACT_STRATEGIES = {
-        EC.ES_FULL_REFRESH: True,
-        EC.ES_INCREMENTAL: True,
-    }
+    _ACCEPTED_EXTRACT_STRATEGIES = frozenset({EC.ES_FULL_REFRESH, EC.ES_INCREMENTAL})
 
     _CONN_TYPE = EWAHSalesforceHook.conn_type
 
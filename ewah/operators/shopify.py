@@ -2,8 +2,6 @@ from ewah.operators.base import EWAHBaseOperator
 from ewah.ewah_utils.python_utils import is_iterable_not_string
 from ewah.constants import EWAHConstants as EC
 
-from ewah.hooks.base import EWAHBaseHook as BaseHook
-
 from datetime import datetime, timedelta
 from pytz import timezone
 
@@ -18,10 +16,7 @@ class EWAHShopifyOperator(EWAHBaseOperator):
 
     _NAMES = ["shopify"]
 
-    _ACCEPTED_EXTRACT_STRATEGIES = {
-        EC.ES_FULL_REFRESH: False,
-        EC.ES_INCREMENTAL: True,
-    }
+    _ACCEPTED_EXTRACT_STRATEGIES = frozenset({EC.ES_INCREMENTAL})
 
     _acceptable_api_versions = [
         "2020-07",
@@ -353,7 +348,7 @@ class EWAHShopifyOperator(EWAHBaseOperator):
         )
 
         # get connection for the applicable shop
-        conn = BaseHook.get_connection(source_conn_id)
+        conn = self.get_cached_connection(source_conn_id)
         login = conn.login
         password = conn.password
 
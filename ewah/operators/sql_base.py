@@ -18,10 +18,7 @@ class EWAHSQLBaseOperator(EWAHBaseOperator):
     # base operator
     # _NAMES = []
 
-    _ACCEPTED_EXTRACT_STRATEGIES = {
-        EC.ES_FULL_REFRESH: True,
-        EC.ES_INCREMENTAL: True,
-    }
+    _ACCEPTED_EXTRACT_STRATEGIES = frozenset({EC.ES_FULL_REFRESH, EC.ES_INCREMENTAL})
 
     def __init__(
         self,
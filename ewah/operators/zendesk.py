@@ -15,10 +15,7 @@ class EWAHZendeskOperator(EWAHBaseOperator):
 
     _NAMES = ["zendesk"]
 
-    _ACCEPTED_EXTRACT_STRATEGIES = {
-        EC.ES_FULL_REFRESH: False,
-        EC.ES_INCREMENTAL: True,
-    }
+    _ACCEPTED_EXTRACT_STRATEGIES = frozenset({EC.ES_INCREMENTAL})
 
     _base_url = "https://{support_url}.zendesk.com/{endpoint}"
 
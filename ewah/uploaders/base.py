@@ -15,6 +15,11 @@ from bson.json_util import dumps
 from decimal import Decimal
 from typing import Optional, Type, Union, Dict
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 class EWAHJSONEncoder(json.JSONEncoder):
     """Extension of the native json encoder to deal with additional datatypes and
@@ -91,6 +96,43 @@ class EWAHJSONEncoder(json.JSONEncoder):
         )(o, 0)
 
 
+if orjson is not None:
+    # Dict keys may be e.g. integers, like with the json module; datetimes and
+    # dataclasses are not serialized by the json module either
+    _ORJSON_OPTIONS = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+
+
+def _orjson_default(obj):
+    # Same additional datatypes as EWAHJSONEncoder.default()
+    if isinstance(obj, bson.objectid.ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
+
+
+def json_dumps(value) -> str:
+    """Serialize value to a JSON string, using orjson if it is installed.
+
+    NaN and (+/-) Infinity are serialized as null. Values that orjson can't
+    serialize, e.g. integers above 64 bit, are serialized with EWAHJSONEncoder.
+    Datetimes raise a TypeError either way. Note that orjson writes compact JSON
+    with unescaped non-ASCII characters and serializes UUIDs and enums.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                value, default=_orjson_default, option=_ORJSON_OPTIONS
+            ).decode()
+        except orjson.JSONEncodeError:
+            pass  # retry with the json module, which may raise a TypeError
+    return json.dumps(value, cls=EWAHJSONEncoder)
+
+
 class EWAHBaseUploader(LoggingMixin):
     """Base class for all EWAH uploader classes aka Uploaders.
 
@@ -244,6 +286,40 @@ class EWAHBaseUploader(LoggingMixin):
         hash_columns=None,
         hashlib_func_name=None,
     ):
+        upload_kwargs = self.prepare_data_for_upload(
+            data=data,
+            columns_definition=columns_definition,
+            table_name=table_name,
+            schema_name=schema_name,
+            schema_suffix=schema_suffix,
+            database_name=database_name,
+            drop_and_replace=drop_and_replace,
+            update_on_columns=update_on_columns,
+            clean_data_before_upload=clean_data_before_upload,
+            hash_columns=hash_columns,
+            hashlib_func_name=hashlib_func_name,
+        )
+        self.upload_prepared_data(upload_kwargs, commit=commit)
+
+    def prepare_data_for_upload(
+        self,
+        data,
+        columns_definition,
+        table_name,
+        schema_name,
+        schema_suffix,
+        database_name=None,
+        drop_and_replace=True,
+        update_on_columns=None,
+        clean_data_before_upload=True,
+        hash_columns=None,
+        hashlib_func_name=None,
+    ):
+        """Clean data for upload and build the arguments for the upload.
+
+        Does not use the DWH connection. Returns the keyword arguments to pass to
+        upload_prepared_data().
+        """
         # check this again with Snowflake!!
         database_name = database_name or getattr(self, "database", None)
 
@@ -314,8 +390,11 @@ class EWAHBaseUploader(LoggingMixin):
             cols_list = list(raw_row.keys())
             if hash_columns:
                 hash_func = getattr(hashlib, hashlib_func_name)
+            # Pop from the end in reverse order to free up memory as rows are
+            # cleaned without shifting the remaining rows every time
+            data.reverse()
             while data:
-                datum = data.pop(0)
+                datum = data.pop()
                 # Make sure that each dict in upload_data has all keys
                 row = deepcopy(raw_row)
                 for column_name, value in datum.items():
@@ -334,9 +413,7 @@ class EWAHBaseUploader(LoggingMixin):
                                 or (not isinstance(value, mapped_types))
                             ):
                                 try:
-                                    row[column_name] = json.dumps(
-                                        value, cls=EWAHJSONEncoder
-                                    )
+                                    row[column_name] = json_dumps(value)
                                 except TypeError:
                                     # try dumping with bson utility function
                                     row[column_name] = dumps(value)
@@ -346,17 +423,9 @@ class EWAHBaseUploader(LoggingMixin):
                             else:
                                 row[column_name] = value
                 upload_data += [row]
-            data_len = len(upload_data)
         else:
-            data_len = len(data)
             upload_data = None
 
-        self.log.info(
-            "Uploading {0} rows of data...".format(
-                str(data_len),
-            )
-        )
-
         kwargs = {}
         if database_name:
             kwargs["database_name"] = database_name
@@ -374,7 +443,16 @@ class EWAHBaseUploader(LoggingMixin):
                 "pk_columns": pk_columns,
             }
         )
-        self._create_or_update_table(**kwargs)
+        return kwargs
+
+    def upload_prepared_data(self, upload_kwargs, commit=False):
+        "Upload data prepared by prepare_data_for_upload()."
+        self.log.info(
+            "Uploading {0} rows of data...".format(
+                str(len(upload_kwargs["data"])),
+            )
+        )
+        self._create_or_update_table(**upload_kwargs)
 
         if commit:
             self.dwh_hook.commit()
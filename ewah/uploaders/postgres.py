@@ -1,7 +1,40 @@
-from ewah.uploaders.base import EWAHBaseUploader
+from ewah.uploaders.base import EWAHBaseUploader, json_dumps
 from ewah.hooks.postgres import EWAHPostgresHook
 from ewah.constants import EWAHConstants as EC
-from psycopg2.extras import execute_values
+
+from datetime import date, datetime, time, timedelta
+
+import io
+
+# characters that must be escaped in the text format of COPY
+_COPY_ESCAPES = str.maketrans(
+    {
+        "\\": "\\\\",
+        "\n": "\\n",
+        "\r": "\\r",
+        "\t": "\\t",
+    }
+)
+
+
+def _to_copy_text(value):
+    """Format a value as a field of a row in the text format of COPY."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime, date, time)):
+        text = value.isoformat()
+    elif isinstance(value, timedelta):
+        text = "{0} seconds".format(value.total_seconds())
+    elif isinstance(value, (dict, list, tuple)):
+        # only happens if data was not cleaned before upload
+        text = json_dumps(value)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        text = "\\x" + bytes(value).hex()  # bytea hex format
+    else:
+        text = str(value)
+    return text.translate(_COPY_ESCAPES)
 
 
 class EWAHPostgresUploader(EWAHBaseUploader):
@@ -39,6 +72,10 @@ class EWAHPostgresUploader(EWAHBaseUploader):
 
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(EC.DWH_ENGINE_POSTGRES, *args, **kwargs)
+        # Uploads of multiple chunks of data into the same table reuse the upload
+        # statements and only make sure once that the unique constraint exists
+        self._upload_statements = {}
+        self._tables_with_unique_constraint = set()
 
     def commit(self):
         self.dwh_hook.commit()
@@ -64,12 +101,14 @@ class EWAHPostgresUploader(EWAHBaseUploader):
     ):
         self.log.info("Preparing DWH Tables...")
         schema_name += schema_suffix
+        constraint_key = (schema_name, table_name, tuple(update_on_columns or []))
         if drop_and_replace or (
             not self.test_if_table_exists(
                 table_name=table_name,
                 schema_name=schema_name,
             )
         ):
+            self._tables_with_unique_constraint.discard(constraint_key)
             self.dwh_hook.execute(
                 sql="""
                     DROP TABLE IF EXISTS "{schema_name}"."{table_name}" CASCADE;
@@ -93,7 +132,11 @@ class EWAHPostgresUploader(EWAHBaseUploader):
                     )
                 )
 
-        if not drop_and_replace and update_on_columns:
+        if (
+            not drop_and_replace
+            and update_on_columns
+            and not constraint_key in self._tables_with_unique_constraint
+        ):
             # make sure there is a unique constraint for update_on_columns
             self.dwh_hook.execute(
                 sql="""
@@ -109,63 +152,48 @@ class EWAHPostgresUploader(EWAHBaseUploader):
                 ),
                 commit=False,
             )
+            self._tables_with_unique_constraint.add(constraint_key)
 
-        set_columns = []
-        for column in columns_definition.keys():
-            if not (column in update_on_columns):
-                set_columns += [column]
-
+        # COPY the data into a temporary table first, then insert it from there.
+        # This avoids binding every single row while still allowing upserts.
         cols_list = list(columns_definition.keys())
-        sql = (
-            """
-            INSERT INTO "{schema_name}"."{table_name}"
-            ("{column_names}") VALUES {placeholder}
-            ON CONFLICT {do_on_conflict};
-        """.format(
-                **{
-                    "schema_name": schema_name,
-                    "table_name": table_name,
-                    "placeholder": "{placeholder}",
-                    "column_names": '", "'.join(cols_list),
-                    "do_on_conflict": "DO NOTHING"
-                    if drop_and_replace or not update_on_columns
-                    else """
-                ("{update_on_columns}") DO UPDATE SET\n\t{sets}
-            """.format(
-                        update_on_columns='", "'.join(update_on_columns),
-                        sets="\n\t,".join(
-                            [
-                                '"{column}" = EXCLUDED."{column}"'.format(column=column)
-                                for column in set_columns
-                            ]
-                        ),
-                    ),
-                }
-            )
-            .replace("%", "%%")
-            .format(
-                **{
-                    "placeholder": "%s",
-                }
+        upsert = not drop_and_replace and bool(update_on_columns)
+        statement_key = (schema_name, table_name, tuple(cols_list), upsert)
+        if not statement_key in self._upload_statements:
+            self._upload_statements[statement_key] = self._get_upload_statements(
+                schema_name=schema_name,
+                table_name=table_name,
+                cols_list=cols_list,
+                update_on_columns=update_on_columns if upsert else None,
             )
+        sql_copy, sql = self._upload_statements[statement_key]
+
+        self.dwh_hook.execute(
+            sql="""
+                DROP TABLE IF EXISTS pg_temp."_ewah_upload";
+                CREATE TEMPORARY TABLE "_ewah_upload"
+                    (LIKE "{schema_name}"."{table_name}" INCLUDING DEFAULTS);
+                -- keep the order of the data for upserts
+                ALTER TABLE pg_temp."_ewah_upload"
+                    ADD COLUMN "_ewah_upload_row" BIGSERIAL;
+            """.format(
+                schema_name=schema_name,
+                table_name=table_name,
+            ),
+            commit=False,
         )
-        self.log.info("Now Uploading! Using SQL:\n\n{0}".format(sql))
-        # escape crappy column names by using aliases in the psycopg2 template
-        cols_map = {cols_list[i]: "col_" + str(i) for i in range(len(cols_list))}
-        template = "(%(" + ")s, %(".join([val for key, val in cols_map.items()]) + ")s)"
         cur = self.dwh_hook.cursor
         while data:
-            upload_data = [
-                {cols_map[key]: val for key, val in row.items()}
-                for row in data[:upload_chunking]
-            ]
+            buffer = io.StringIO()
+            for row in data[:upload_chunking]:
+                buffer.write("\t".join([_to_copy_text(row.get(c)) for c in cols_list]))
+                buffer.write("\n")
             del data[:upload_chunking]  # Free up memory ASAP
-            execute_values(
-                cur=cur,
-                sql=sql,
-                argslist=upload_data,
-                template=template,
-            )
+            buffer.seek(0)
+            cur.copy_expert(sql=sql_copy, file=buffer)
+
+        self.log.info("Now Uploading! Using SQL:\n\n{0}".format(sql))
+        self.dwh_hook.execute(sql=sql, commit=False)
         self.log.info("Upload done.")
 
         self.dwh_hook.execute(
@@ -173,6 +201,53 @@ class EWAHPostgresUploader(EWAHBaseUploader):
             commit=False,
         )
 
+    @staticmethod
+    def _get_upload_statements(schema_name, table_name, cols_list, update_on_columns):
+        """Return the COPY statement into the temporary table and the statement
+        inserting from the temporary table into the target table. Upserts if
+        update_on_columns is given.
+        """
+        column_names = '", "'.join(cols_list)
+        sql_copy = 'COPY pg_temp."_ewah_upload" ("{0}") FROM STDIN'.format(column_names)
+
+        if not update_on_columns:
+            sql_select = 'SELECT "{0}" FROM pg_temp."_ewah_upload"'.format(column_names)
+            do_on_conflict = "DO NOTHING"
+        else:
+            # Only the last row of each key may be upserted
+            sql_select = """
+                SELECT DISTINCT ON ("{update_on_columns}") "{column_names}"
+                FROM pg_temp."_ewah_upload"
+                ORDER BY "{update_on_columns}", "_ewah_upload_row" DESC
+            """.format(
+                update_on_columns='", "'.join(update_on_columns),
+                column_names=column_names,
+            )
+            do_on_conflict = """("{update_on_columns}") DO UPDATE SET\n\t{sets}
+            """.format(
+                update_on_columns='", "'.join(update_on_columns),
+                sets="\n\t,".join(
+                    [
+                        '"{column}" = EXCLUDED."{column}"'.format(column=column)
+                        for column in cols_list
+                        if not column in update_on_columns
+                    ]
+                ),
+            )
+        sql = """
+            INSERT INTO "{schema_name}"."{table_name}"
+            ("{column_names}") {sql_select}
+            ON CONFLICT {do_on_conflict};
+            DROP TABLE pg_temp."_ewah_upload";
+        """.format(
+            schema_name=schema_name,
+            table_name=table_name,
+            column_names=column_names,
+            sql_select=sql_select,
+            do_on_conflict=do_on_conflict,
+        )
+        return (sql_copy, sql)
+
     def test_if_table_exists(self, table_name, schema_name):
         return bool(
             self.dwh_hook.execute_and_return_result(
@@ -42,4 +42,7 @@ setuptools.setup(
         "stripe",
         "yahoofinancials",
     ],
+    extras_require={
+        "orjson": ["orjson"],  # faster json_dumps for uploads
+    },
 )
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("airflow.models")
+
+from ewah.constants import EWAHConstants as EC
+from ewah.dag_factories.dag_factory_fullcremental import dag_factory_fullcremental
+from ewah.operators.s3 import EWAHS3Operator
+
+
+def _dags(**kwargs):
+    return dag_factory_fullcremental(
+        dag_name="test",
+        dwh_engine=EC.DWH_ENGINE_POSTGRES,
+        dwh_conn_id="dwh",
+        airflow_conn_id="airflow",
+        start_date=datetime(2021, 1, 1, tzinfo=timezone.utc),
+        el_operator=EWAHS3Operator,
+        operator_config={
+            "general_config": {
+                "source_conn_id": "s3",
+                "bucket_name": "bucket",
+                "file_format": "CSV",
+                "primary_key_column_name": "id",
+            },
+            "tables": {"table": None},
+        },
+        target_schema_name="schema",
+        **kwargs
+    )
+
+
+@pytest.mark.parametrize(
+    "catchup_full_refresh, catchup_incremental",
+    [(True, True), (True, False), (False, False)],
+)
+def test_incremental_starts_after_full_refresh(
+    catchup_full_refresh, catchup_incremental
+):
+    dag_fr, dag_inc = _dags(
+        catchup_full_refresh=catchup_full_refresh,
+        catchup_incremental=catchup_incremental,
+    )
+    assert dag_inc.start_date - dag_fr.start_date == timedelta(days=1)
+    assert dag_fr.start_date <= datetime.now(timezone.utc) - timedelta(days=1)
+
+
+@pytest.mark.parametrize("poke_interval", [0, timedelta(0)])
+def test_zero_sensor_poke_interval_is_kept(poke_interval):
+    dag_fr, dag_inc = _dags(
+        fr_sensor_poke_interval=poke_interval,
+        inc_sensor_poke_interval=poke_interval,
+    )
+    assert dag_fr.get_task("sense_run_validity").poke_interval == 0
+    assert dag_inc.get_task("sense_run_validity").poke_interval == 0
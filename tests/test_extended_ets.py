@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import pytest
+
+external_task = pytest.importorskip("airflow.sensors.external_task")
+
+from ewah.dag_factories.dag_factory_incremental import ExtendedETS
+
+START_DATE = datetime(2021, 1, 2, tzinfo=timezone.utc)
+
+
+def _sensor():
+    return ExtendedETS(
+        task_id="sense_run_validity",
+        external_dag_id="dag_inc",
+        external_task_id="final_inc",
+        execution_delta=timedelta(hours=1),
+        backfill_dag_id="dag_fr",
+        backfill_external_task_id="final_fr",
+        backfill_execution_date_fn=lambda execution_date: START_DATE,
+    )
+
+
+def _context(execution_date, previous_dagrun):
+    dag_run = mock.Mock()
+    dag_run.get_previous_dagrun.return_value = previous_dagrun
+    return {
+        "dag": mock.Mock(start_date=START_DATE),
+        "execution_date": execution_date,
+        "dag_run": dag_run,
+    }
+
+
+@mock.patch.object(external_task.ExternalTaskSensor, "execute")
+def test_first_run_at_start_date_waits_for_backfill(ets_execute):
+    sensor = _sensor()
+    sensor.execute(_context(START_DATE, previous_dagrun=None))
+    assert sensor.external_dag_id == "dag_fr"
+    assert sensor.external_task_id == "final_fr"
+    ets_execute.assert_called_once()
+
+
+@mock.patch.object(external_task.ExternalTaskSensor, "execute")
+def test_first_run_after_start_date_waits_for_backfill(ets_execute):
+    # Without catchup, the first DagRun is the latest interval
+    sensor = _sensor()
+    sensor.execute(_context(START_DATE + timedelta(hours=5), previous_dagrun=None))
+    assert sensor.external_dag_id == "dag_fr"
+    assert sensor.external_task_id == "final_fr"
+    assert sensor.execution_delta is None
+    ets_execute.assert_called_once()
+
+
+@mock.patch.object(external_task.ExternalTaskSensor, "execute")
+def test_later_run_waits_for_previous_run(ets_execute):
+    sensor = _sensor()
+    sensor.execute(
+        _context(START_DATE + timedelta(hours=5), previous_dagrun=mock.Mock())
+    )
+    assert sensor.external_dag_id == "dag_inc"
+    assert sensor.external_task_id == "final_inc"
+    assert sensor.execution_delta == timedelta(hours=1)
+    ets_execute.assert_called_once()
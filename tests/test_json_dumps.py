@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+pytest.importorskip("airflow.models")
+
+from ewah.uploaders import base
+
+
+@pytest.fixture(params=["orjson", "json"])
+def json_dumps(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(base, "orjson", None)
+    return base.json_dumps
+
+
+def test_int_keys(json_dumps):
+    assert json.loads(json_dumps({1: "a", 2: {3: "b"}})) == {"1": "a", "2": {"3": "b"}}
+
+
+def test_nan_and_infinity_are_null(json_dumps):
+    value = {1: float("nan"), "b": [float("inf"), -float("inf")]}
+    dumped = json_dumps(value)
+    assert "NaN" not in dumped and "Infinity" not in dumped
+    assert json.loads(dumped) == {"1": None, "b": [None, None]}
+
+
+def test_non_ascii(json_dumps):
+    value = {"name": "Zürich ☃", "emoji": "\U0001f600"}
+    assert json.loads(json_dumps(value)) == value
+
+
+def test_big_ints(json_dumps):
+    value = {"big": 2**64 + 1, "negative": -(2**70)}
+    assert json.loads(json_dumps(value)) == value
+
+
+def test_json_module_separators(monkeypatch):
+    monkeypatch.setattr(base, "orjson", None)
+    assert base.json_dumps({"a": [1, 2]}) == '{"a": [1, 2]}'
@@ -0,0 +1,153 @@
+import json
+from datetime import date, datetime, time, timedelta, timezone
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("airflow.models")
+
+from ewah.uploaders.postgres import EWAHPostgresUploader, _to_copy_text
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, "\\N"),
+        ("", ""),
+        ("a\\b", "a\\\\b"),
+        ("a\tb", "a\\tb"),
+        ("a\nb", "a\\nb"),
+        ("a\rb", "a\\rb"),
+        ("\\N", "\\\\N"),
+        (True, "t"),
+        (False, "f"),
+        (0, "0"),
+        (1.5, "1.5"),
+        (b"\x00\xffa", "\\\\x00ff61"),
+        (bytearray(b"\x01"), "\\\\x01"),
+        (memoryview(b"\x01"), "\\\\x01"),
+        (date(2021, 1, 2), "2021-01-02"),
+        (time(3, 4, 5), "03:04:05"),
+        (datetime(2021, 1, 2, 3, 4, 5), "2021-01-02T03:04:05"),
+        (
+            datetime(2021, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            "2021-01-02T03:04:05+00:00",
+        ),
+        (timedelta(minutes=1, milliseconds=5), "60.005 seconds"),
+    ],
+)
+def test_to_copy_text(value, expected):
+    assert _to_copy_text(value) == expected
+
+
+@pytest.mark.parametrize("value", [{"a": 'b"\n', "c": [1, None]}, [1.5, "\t"]])
+def test_to_copy_text_json(value):
+    # the backslashes of escapes within JSON strings are escaped as well
+    text = _to_copy_text(value)
+    assert "\\\\" in text
+    assert json.loads(text.replace("\\\\", "\\")) == value
+
+
+def _statements(update_on_columns):
+    return EWAHPostgresUploader._get_upload_statements(
+        schema_name="schema",
+        table_name="table",
+        cols_list=["id", "name", "value"],
+        update_on_columns=update_on_columns,
+    )
+
+
+def _normalize(sql):
+    return " ".join(sql.split())
+
+
+def test_upload_statements_insert():
+    sql_copy, sql = _statements(None)
+    assert sql_copy == (
+        'COPY pg_temp."_ewah_upload" ("id", "name", "value") FROM STDIN'
+    )
+    assert _normalize(sql) == _normalize(
+        """
+        INSERT INTO "schema"."table"
+        ("id", "name", "value") SELECT "id", "name", "value"
+        FROM pg_temp."_ewah_upload"
+        ON CONFLICT DO NOTHING;
+        DROP TABLE pg_temp."_ewah_upload";
+        """
+    )
+
+
+def test_upload_statements_upsert():
+    sql_copy, sql = _statements(["id"])
+    assert sql_copy == (
+        'COPY pg_temp."_ewah_upload" ("id", "name", "value") FROM STDIN'
+    )
+    assert _normalize(sql) == _normalize(
+        """
+        INSERT INTO "schema"."table"
+        ("id", "name", "value")
+        SELECT DISTINCT ON ("id") "id", "name", "value"
+        FROM pg_temp."_ewah_upload"
+        ORDER BY "id", "_ewah_upload_row" DESC
+        ON CONFLICT ("id") DO UPDATE SET
+        "name" = EXCLUDED."name" ,"value" = EXCLUDED."value" ;
+        DROP TABLE pg_temp."_ewah_upload";
+        """
+    )
+
+
+def _upload(uploader, update_on_columns, drop_and_replace):
+    uploader._create_or_update_table(
+        data=[{"id": 1, "name": "a"}],
+        table_name="table",
+        schema_name="schema",
+        schema_suffix="",
+        columns_definition={"id": {}, "name": {}},
+        columns_partial_query='"id" TEXT, "name" TEXT',
+        update_on_columns=update_on_columns,
+        drop_and_replace=drop_and_replace,
+    )
+
+
+def _executed(uploader):
+    return [
+        _normalize(call[1]["sql"]) for call in uploader.dwh_hook.execute.call_args_list
+    ]
+
+
+@pytest.mark.parametrize(
+    "update_on_columns, drop_and_replace",
+    [(None, False), ([], False), (["id"], True)],
+)
+def test_upload_without_unique_constraint(update_on_columns, drop_and_replace):
+    uploader = EWAHPostgresUploader(dwh_conn=mock.MagicMock())
+    uploader.dwh_hook.execute_and_return_result.return_value = [["table"]]
+    _upload(uploader, update_on_columns, drop_and_replace)
+
+    executed = _executed(uploader)
+    assert not any("ADD CONSTRAINT" in sql for sql in executed)
+    assert any("ON CONFLICT DO NOTHING;" in sql for sql in executed)
+    copied = uploader.dwh_hook.cursor.copy_expert.call_args[1]["file"]
+    assert copied.getvalue() == "1\ta\n"
+
+
+def test_upsert_adds_unique_constraint_once():
+    uploader = EWAHPostgresUploader(dwh_conn=mock.MagicMock())
+    uploader.dwh_hook.execute_and_return_result.return_value = [["table"]]
+    _upload(uploader, ["id"], False)
+    _upload(uploader, ["id"], False)
+
+    executed = _executed(uploader)
+    constraints = [sql for sql in executed if "ADD CONSTRAINT" in sql]
+    assert constraints == [
+        _normalize(
+            """
+            ALTER TABLE "schema"."table"
+            DROP CONSTRAINT IF EXISTS "ufu_schema_table";
+            ALTER TABLE "schema"."table"
+            ADD CONSTRAINT "ufu_schema_table" UNIQUE ("id");
+            """
+        )
+    ]
+    upserts = [sql for sql in executed if 'ON CONFLICT ("id") DO UPDATE' in sql]
+    assert len(upserts) == 2
@@ -0,0 +1,250 @@
+import bz2
+import csv
+import gzip
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("airflow.providers.amazon")
+
+from ewah.constants import EWAHConstants as EC
+from ewah.operators import s3
+
+
+@pytest.fixture(params=["ijson", "orjson", "json"])
+def parser(request, monkeypatch):
+    "Run a test with each of the optional JSON parsers, and without them."
+    if request.param == "ijson":
+        pytest.importorskip("ijson")
+        return
+    monkeypatch.setattr(s3, "ijson", None)
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(s3, "orjson", None)
+
+
+# The loaders of the operator before files were parsed from streams
+def _baseline_json(raw_data):
+    return json.loads(raw_data.decode("utf-8"))
+
+
+def _baseline_firehose_json(raw_data):
+    return json.loads("[" + raw_data.decode("utf-8").replace("}{", "},{") + "]")
+
+
+def _baseline_csv(raw_data, csv_encoding="utf-8", **csv_format_options):
+    if raw_data[:3] == s3._BOM:
+        raw_data = raw_data[3:]
+        encoding = "utf-8"
+    else:
+        encoding = csv_encoding
+    try:
+        lines = raw_data.decode(encoding).splitlines()
+    except UnicodeDecodeError:
+        if encoding == csv_encoding:
+            raise
+        lines = raw_data.decode(csv_encoding).splitlines()
+    return list(csv.DictReader(lines, **csv_format_options))
+
+
+JSON_RECORDS = [
+    {"id": 1, "name": "Zürich", "value": 1.5, "tags": ["a", "b"], "empty": None},
+    {"id": 2, "name": 'quote " and\nnewline', "nested": {"x": True}},
+    {"id": 2**40, "value": -0.0001},
+]
+
+
+def _compress(raw_data, compression):
+    if compression == "gzip":
+        return gzip.compress(raw_data)
+    if compression == "bz2":
+        return bz2.compress(raw_data)
+    return raw_data
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", "bz2"])
+def test_open_stream(compression):
+    raw_data = b"a,b\n1,2\n" * 1000
+    stream = s3._open_stream(_compress(raw_data, compression), compression)
+    assert stream.read(3) == b"a,b"
+    stream.seek(0)  # _load_csv seeks back after checking for a BOM
+    assert stream.read() == raw_data
+
+
+def test_open_stream_zstd():
+    zstandard = pytest.importorskip("zstandard")
+    raw_data = b"a,b\n1,2\n" * 1000
+    compressed = zstandard.ZstdCompressor().compress(raw_data)
+    stream = s3._open_stream(compressed, "zstd")
+    assert stream.read(3) == b"a,b"
+    stream.seek(0)
+    assert stream.read() == raw_data
+
+
+def test_format_dispatch():
+    assert s3._FORMAT_DISPATCH == {
+        "JSON": s3._load_json,
+        "AWS_FIREHOSE_JSON": s3._load_firehose_json,
+    }
+    assert set(s3._FORMAT_DISPATCH) | {"CSV"} == set(
+        s3.EWAHS3Operator._IMPLEMENTED_FORMATS
+    )
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", "bz2"])
+@pytest.mark.parametrize("records", [JSON_RECORDS, []])
+def test_load_json(parser, compression, records):
+    raw_data = json.dumps(records).encode("utf-8")
+    stream = s3._open_stream(_compress(raw_data, compression), compression)
+    loaded = s3._load_json(stream)
+    assert list(loaded) == _baseline_json(raw_data)
+
+
+@pytest.mark.parametrize(
+    "f_load, raw_data",
+    [
+        (s3._load_json, b'[{"a": 1}, {"a": NaN, "b": 12345678901234567890123}]'),
+        (s3._load_firehose_json, b'{"a": 1}{"a": NaN, "b": 12345678901234567890123}'),
+    ],
+)
+def test_load_json_nan(parser, f_load, raw_data):
+    # json accepts NaN and big integers, the other parsers fall back to it
+    loaded = list(f_load(s3._open_stream(raw_data)))
+    assert len(loaded) == 2 and loaded[0] == {"a": 1}
+    assert loaded[1]["a"] != loaded[1]["a"]
+    assert loaded[1]["b"] == 12345678901234567890123
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", "bz2"])
+@pytest.mark.parametrize("separator", ["", "\n"])
+def test_load_firehose_json(parser, compression, separator):
+    raw_data = separator.join(json.dumps(record) for record in JSON_RECORDS)
+    raw_data = raw_data.encode("utf-8")
+    stream = s3._open_stream(_compress(raw_data, compression), compression)
+    loaded = list(s3._load_firehose_json(stream))
+    assert loaded == JSON_RECORDS
+    if not separator:
+        assert loaded == _baseline_firehose_json(raw_data)
+
+
+def test_load_firehose_json_empty(parser):
+    assert list(s3._load_firehose_json(s3._open_stream(b""))) == []
+
+
+def test_iter_concatenated_json():
+    text = ' {"a": 1}{"a": {"b": 2}}\n{"a": "}{"} \n'
+    assert list(s3._iter_concatenated_json(text)) == [
+        {"a": 1},
+        {"a": {"b": 2}},
+        {"a": "}{"},
+    ]
+    assert list(s3._iter_concatenated_json(" \n")) == []
+
+
+@pytest.mark.parametrize(
+    "text, kwargs",
+    [
+        ("a,b\n1,2\n3,4\n", {}),
+        ("a,b\r\n1,2\r\n\r\n3,4", {}),
+        ("a,b\n1\n1,2,3,4\n", {}),
+        ("a,b\n1\n1,2,3,4\n", {"restkey": "rest", "restval": "default"}),
+        ("1,2\n3,4\n", {"fieldnames": ["x", "y"]}),
+        ("a;b\n'1;2';3\n", {"delimiter": ";", "quotechar": "'"}),
+        ("", {}),
+        ("a,b", {}),
+    ],
+)
+def test_iter_csv_records(text, kwargs):
+    records = list(s3._iter_csv_records(io.StringIO(text, newline=""), **kwargs))
+    assert records == list(csv.DictReader(io.StringIO(text, newline=""), **kwargs))
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", "bz2"])
+@pytest.mark.parametrize(
+    "raw_data, csv_encoding, csv_format_options",
+    [
+        ('id,name\n1,Zürich\n2,"a, b"\n'.encode("utf-8"), "utf-8", {}),
+        (s3._BOM + "id,name\r\n1,Zürich\r\n".encode("utf-8"), "latin-1", {}),
+        (s3._BOM + "id,name\n1,Zürich\n".encode("latin-1"), "latin-1", {}),
+        ("id;name\n1;Zürich\n".encode("latin-1"), "latin-1", {"delimiter": ";"}),
+        (b"1,2\n3,4\n", "utf-8", {"fieldnames": ["x", "y"]}),
+        (b"", "utf-8", {}),
+    ],
+)
+def test_load_csv(compression, raw_data, csv_encoding, csv_format_options):
+    stream = s3._open_stream(_compress(raw_data, compression), compression)
+    loaded = s3._load_csv(
+        stream, csv_encoding=csv_encoding, csv_format_options=csv_format_options
+    )
+    expected = _baseline_csv(raw_data, csv_encoding, **csv_format_options)
+    assert list(loaded) == expected
+
+
+def _operator(**kwargs):
+    return s3.EWAHS3Operator(
+        task_id="load",
+        source_conn_id="s3",
+        dwh_engine=EC.DWH_ENGINE_POSTGRES,
+        dwh_conn_id="dwh",
+        target_table_name="table",
+        target_schema_name="schema",
+        extract_strategy=EC.ES_FULL_REFRESH,
+        bucket_name="bucket",
+        **kwargs
+    )
+
+
+def _object(key):
+    return {"Key": key, "LastModified": datetime(2021, 1, 1)}
+
+
+def test_parse_in_processes_from_thread():
+    operator = _operator(file_format="JSON", decompress="infer", parse_workers=2)
+    objects = []
+    for i in range(7):
+        raw_data = json.dumps([{"file": i, "row": j} for j in range(3)]).encode()
+        if i % 2:
+            objects.append((_object("{0}.json.gz".format(i)), gzip.compress(raw_data)))
+        else:
+            objects.append((_object("{0}.json".format(i)), raw_data))
+
+    def parse():
+        parsed = operator._parse_in_processes(iter(objects), s3._load_json)
+        return [(obj["Key"], list(records)) for (obj, records) in parsed]
+
+    # like in execute_json, the pool is created from a thread of the operator
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        parsed = executor.submit(parse).result(timeout=120)
+
+    assert [key for (key, _) in parsed] == [obj["Key"] for (obj, _) in objects]
+    for (i, (_, records)) in enumerate(parsed):
+        assert records == [{"file": i, "row": j} for j in range(3)]
+
+
+def test_batches_do_not_span_files(monkeypatch):
+    operator = _operator(file_format="JSON", upload_batch_rows=2)
+    files = {"a.json": [{"id": 1}, {"id": 2}, {"id": 3}], "b.json": [{"id": 4}]}
+    objects = [
+        (_object(key), json.dumps(data).encode()) for (key, data) in files.items()
+    ]
+    monkeypatch.setattr(operator, "_get_client", lambda: None)
+    monkeypatch.setattr(operator, "_get_objects_to_load", lambda client: None)
+    monkeypatch.setattr(operator, "_download_objects", lambda client, _: objects)
+    uploads = []
+    monkeypatch.setattr(
+        operator,
+        "upload_data",
+        lambda data: uploads.append((dict(operator._metadata), data)),
+    )
+    operator.ewah_execute(context={})
+
+    metadata = {"bucket_name": "bucket", "file_last_modified": "2021-01-01 00:00:00"}
+    assert uploads == [
+        ({**metadata, "file_name": "a.json"}, [{"id": 1}, {"id": 2}]),
+        ({**metadata, "file_name": "a.json"}, [{"id": 3}]),
+        ({**metadata, "file_name": "b.json"}, [{"id": 4}]),
+    ]